@@ -0,0 +1,116 @@
+"""Benchmark the number of file system calls needed to walk a directory for a report.
+
+Compares the previous approach, where the tree generator (`iterdir` + `is_dir`/`is_file`)
+and the content reader (`rglob("*")` + `is_file`) each walk the directory, with a single
+`DirectoryScanner` snapshot shared by both, which also prunes ignored directories.
+
+Run from the repository root:
+
+    PYTHONPATH=.:normyformy python benchmarks/bench_directory_scan.py --files 20000
+"""
+
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+from core.file_filter import FileFilter
+from core.file_tree import FileTreeGenerator
+from core.scanner import DirectoryScanner
+
+
+def create_tree(root: pathlib.Path, files: int, files_per_dir: int = 50) -> None:
+    """Create a synthetic tree with nested packages and some ignored directories."""
+    for i in range(files):
+        package = root / f"package_{i // (files_per_dir * 10)}" / f"module_{i // files_per_dir}"
+        if i % files_per_dir == 0:
+            package.mkdir(parents=True, exist_ok=True)
+        (package / f"file_{i}.py").write_text(f"VALUE = {i}\n")
+    ignored = root / "node_modules" / "dependency"
+    ignored.mkdir(parents=True)
+    for i in range(files // 10):
+        (ignored / f"index_{i}.js").write_text("module.exports = {};\n")
+
+
+@contextmanager
+def count_calls(counter: Counter) -> Iterator[Counter]:
+    """Count calls to the `os` functions pathlib uses to access the file system."""
+    originals = {name: getattr(os, name) for name in ("stat", "lstat", "scandir", "listdir")}
+
+    def wrap(name, func):
+        def wrapper(*args, **kwargs):
+            counter[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(os, name, wrap(name, func))
+    try:
+        yield counter
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+
+def legacy_tree(directory: pathlib.Path, file_filter: FileFilter) -> int:
+    """Walk the tree the way `FileTreeGenerator` did before the scanner was introduced."""
+    count = 0
+    contents = sorted(directory.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
+    visible = [path for path in contents if path.is_dir() or (path.is_file() and not file_filter.should_ignore(path))]
+    for path in visible:
+        count += 1
+        if path.is_dir() and not file_filter.should_ignore(path):
+            count += legacy_tree(path, file_filter)
+    return count
+
+
+def legacy_reader(directory: pathlib.Path, file_filter: FileFilter) -> int:
+    """Walk the tree the way `FileContentReader.read_all` did before the scanner was introduced."""
+    return sum(1 for path in directory.rglob("*") if path.is_file() and not file_filter.should_ignore(path))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=20000, help="Number of files to generate.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        create_tree(root, args.files)
+
+        file_filter = FileFilter()
+        before: Counter = Counter()
+        start = time.perf_counter()
+        with count_calls(before):
+            legacy_tree(root, file_filter)
+            legacy_reader(root, file_filter)
+        before_seconds = time.perf_counter() - start
+
+        # A fresh filter, so decisions cached during the legacy walk are not reused
+        file_filter = FileFilter()
+        after: Counter = Counter()
+        start = time.perf_counter()
+        with count_calls(after):
+            scanner = DirectoryScanner(root, file_filter)
+            snapshot = scanner.scan()
+            FileTreeGenerator(root, -1, file_filter, snapshot).generate()
+            for entry in snapshot.iter_files():
+                file_filter.should_ignore(entry.path, is_dir=False)
+        after_seconds = time.perf_counter() - start
+        # `os.DirEntry.stat` does not go through `os.stat`, so add the scanner's own count
+        after["stat"] += scanner.stat_count
+
+    print(f"{'':<10}{'stat':>10}{'lstat':>10}{'scandir':>10}{'listdir':>10}{'seconds':>10}")
+    for label, counts, seconds in (("before", before, before_seconds), ("after", after, after_seconds)):
+        print(
+            f"{label:<10}{counts['stat']:>10}{counts['lstat']:>10}"
+            f"{counts['scandir']:>10}{counts['listdir']:>10}{seconds:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
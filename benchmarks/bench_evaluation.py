@@ -0,0 +1,100 @@
+"""Benchmark the policy evaluation strategies end to end with a simulated LLM.
+
+Reviews a directory with `FakeLLMBackend`, which answers locally after a latency that
+grows with the prompt size, and compares:
+
+- a single call evaluating all policies (`evaluate_policies`),
+- concurrent calls per policy (`evaluate_policies_async`),
+- concurrent calls per shard of the report (`evaluate_policies_in_shards`),
+- an incremental sharded review of the unchanged directory, reusing the state of the
+  previous sharded review.
+
+Run from the repository root:
+
+    PYTHONPATH=.:normyformy python benchmarks/bench_evaluation.py --latency 0.5
+"""
+
+import argparse
+import asyncio
+import pathlib
+import tempfile
+import time
+from typing import Any, Callable
+
+from normyformy.generate_file_report import generate_file_report
+from normyformy.llm_backend import FakeLLMBackend
+from normyformy.main import (
+    PolicyToReview,
+    evaluate_policies,
+    evaluate_policies_async,
+    evaluate_policies_in_shards,
+    extract_policy_data,
+)
+
+POLICIES = [
+    PolicyToReview(name="Separation of concerns", description="Infrastructure code is separated from business logic."),
+    PolicyToReview(name="Small functions", description="Functions do one thing and are short."),
+    PolicyToReview(name="Descriptive names", description="Modules, classes and functions have descriptive names."),
+    PolicyToReview(name="Error handling", description="Errors are handled explicitly and not silently ignored."),
+    PolicyToReview(name="Type hints", description="Public functions have type hints."),
+    PolicyToReview(name="Docstrings", description="Public modules, classes and functions have docstrings."),
+]
+
+
+def measure(name: str, backend: FakeLLMBackend, evaluate: Callable[[], dict[str, Any]]) -> None:
+    """Run an evaluation and print its time, calls and prompt size."""
+    calls, prompt_chars = backend.calls, backend.prompt_chars
+    start = time.perf_counter()
+    evaluation = evaluate()
+    seconds = time.perf_counter() - start
+    policies = extract_policy_data(evaluation)
+    assert len(policies) == len(POLICIES), f"{name} evaluated {len(policies)} of {len(POLICIES)} policies"
+    print(
+        f"{name:<16} {seconds:>8.2f}s  {backend.calls - calls:>4} calls  "
+        f"{(backend.prompt_chars - prompt_chars) / 4 / 1000:>8.1f}k prompt tokens"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", type=pathlib.Path, default=pathlib.Path("normyformy"))
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per call.")
+    parser.add_argument(
+        "--seconds-per-1k-tokens", type=float, default=0.02, help="Simulated seconds per 1000 prompt tokens."
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum concurrent calls.")
+    parser.add_argument("--shard-tokens", type=int, default=8000, help="Token budget of a shard.")
+    args = parser.parse_args()
+
+    backend = FakeLLMBackend(latency_seconds=args.latency, seconds_per_1k_tokens=args.seconds_per_1k_tokens)
+    start = time.perf_counter()
+    report = generate_file_report(args.directory, depth=-1, exclude_hidden=True)
+    print(f"Report of {len(report) / 4 / 1000:.1f}k tokens generated in {time.perf_counter() - start:.2f}s")
+
+    measure("single call", backend, lambda: evaluate_policies(report, POLICIES, backend))
+    measure(
+        "per policy",
+        backend,
+        lambda: asyncio.run(evaluate_policies_async(report, POLICIES, backend, max_concurrency=args.concurrency)),
+    )
+    with tempfile.TemporaryDirectory() as temporary:
+        state_path = pathlib.Path(temporary) / "review_state.json"
+
+        def sharded() -> dict[str, Any]:
+            return asyncio.run(
+                evaluate_policies_in_shards(
+                    args.directory,
+                    POLICIES,
+                    backend,
+                    args.shard_tokens,
+                    max_concurrency=args.concurrency,
+                    review_state_path=state_path,
+                )
+            )
+
+        measure("sharded", backend, sharded)
+        measure("incremental", backend, sharded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark matching paths against a large ignore file.
+
+Compares `pathspec.PathSpec.match_file`, which tries every pattern in turn, with the
+`CompiledMatcher` used by `FileFilter`, which indexes the patterns by literal path parts
+and only tries the patterns that can match. Both must agree for every path.
+
+Run from the repository root:
+
+    PYTHONPATH=.:normyformy python benchmarks/bench_file_filter.py --patterns 400 --paths 20000
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+import pathspec
+
+from core.pattern_matcher import CompiledMatcher
+
+NAMES = ["src", "lib", "tests", "build", "generated", "vendor", "docs", "assets", "tools", "app"]
+EXTENSIONS = ["py", "js", "ts", "json", "log", "md", "cs", "go", "yaml", "tmp"]
+
+
+def create_patterns(count: int, rng: random.Random) -> List[str]:
+    """Create a mix of literal, glob, anchored, directory and negated patterns."""
+    patterns: List[str] = []
+    for i in range(count):
+        name = f"{rng.choice(NAMES)}_{i}"
+        kind = i % 8
+        if kind == 0:
+            patterns.append(f"{name}/")
+        elif kind == 1:
+            patterns.append(f"*.{rng.choice(EXTENSIONS)}_{i}")
+        elif kind == 2:
+            patterns.append(f"/{name}")
+        elif kind == 3:
+            patterns.append(f"{rng.choice(NAMES)}/**/{name}.{rng.choice(EXTENSIONS)}")
+        elif kind == 4:
+            patterns.append(f"!{rng.choice(NAMES)}/keep_{i}.{rng.choice(EXTENSIONS)}")
+        elif kind == 5:
+            patterns.append(f"{name}*")
+        elif kind == 6:
+            patterns.append(f"**/{name}/*.{rng.choice(EXTENSIONS)}")
+        else:
+            patterns.append(f"{name}.{rng.choice(EXTENSIONS)}")
+    return patterns
+
+
+def create_paths(count: int, patterns: int, rng: random.Random) -> List[str]:
+    """Create relative file and directory paths, some of which hit the patterns."""
+    paths: List[str] = []
+    for _ in range(count):
+        depth = rng.randint(1, 6)
+        parts = [f"{rng.choice(NAMES)}_{rng.randrange(patterns)}" for _ in range(depth)]
+        if rng.random() < 0.2:
+            paths.append("/".join(parts) + "/")
+        else:
+            paths.append("/".join(parts) + f".{rng.choice(EXTENSIONS)}")
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patterns", type=int, default=400, help="Number of ignore patterns.")
+    parser.add_argument("--paths", type=int, default=20000, help="Number of paths to match.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patterns = create_patterns(args.patterns, rng)
+    paths = create_paths(args.paths, args.patterns, rng)
+
+    spec = pathspec.PathSpec.from_lines("gitwildmatch", patterns)
+    start = time.perf_counter()
+    matcher = CompiledMatcher.from_spec(spec)
+    compile_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [spec.match_file(path) for path in paths]
+    pathspec_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [matcher.match_file(path) for path in paths]
+    matcher_seconds = time.perf_counter() - start
+
+    mismatches = [path for path, a, b in zip(paths, expected, actual) if a != b]
+    assert not mismatches, f"Compiled matcher disagrees with pathspec for {mismatches[:10]}"
+
+    print(f"{len(patterns)} patterns, {len(paths)} paths, {sum(expected)} ignored")
+    print(f"compiled in {compile_seconds:.3f}s, {matcher.unindexed_count} patterns tried for every path")
+    print(f"pathspec  {pathspec_seconds:>8.3f}s")
+    print(f"compiled  {matcher_seconds:>8.3f}s  ({pathspec_seconds / matcher_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
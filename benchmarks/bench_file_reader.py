@@ -0,0 +1,100 @@
+"""Benchmark reading file contents with and without a second open per file.
+
+Compares the previous `FileContentReader._read_file`, which opened every file once to
+sniff for binary content and again to decode it, with the single-open read path.
+
+Run from the repository root:
+
+    PYTHONPATH=.:normyformy python benchmarks/bench_file_reader.py --files 50000
+"""
+
+import argparse
+import io
+import os
+import pathlib
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from core.file_filter import FileFilter
+from core.file_reader import FileContentReader
+
+
+def create_files(root: pathlib.Path, files: int, files_per_dir: int = 500) -> List[pathlib.Path]:
+    """Create a synthetic tree of small text files with a binary file every 100 files."""
+    paths: List[pathlib.Path] = []
+    for i in range(files):
+        directory = root / f"dir_{i // files_per_dir}"
+        if i % files_per_dir == 0:
+            directory.mkdir()
+        path = directory / f"file_{i}.py"
+        if i % 100 == 0:
+            path.write_bytes(b"\0" * 256)
+        else:
+            path.write_text(f'"""Module {i}."""\n\nVALUE = {i}\n' * 20)
+        paths.append(path)
+    return paths
+
+
+@contextmanager
+def count_calls(counter: Counter) -> Iterator[Counter]:
+    """Count file opens and stats issued through `io` and `os`."""
+    patched = [(io, "open"), (os, "stat"), (os, "fstat")]
+    originals = [(module, name, getattr(module, name)) for module, name in patched]
+
+    def wrap(name, func):
+        def wrapper(*args, **kwargs):
+            counter[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    for module, name, func in originals:
+        setattr(module, name, wrap(name, func))
+    try:
+        yield counter
+    finally:
+        for module, name, func in originals:
+            setattr(module, name, func)
+
+
+def legacy_read_file(file_path: pathlib.Path) -> str:
+    """Read a file the way `FileContentReader._read_file` did before the single-open path."""
+    with file_path.open('rb') as f:
+        is_binary = b'\0' in f.read(1024)
+    if is_binary:
+        return f"[Binary file] Size: {file_path.stat().st_size} bytes"
+    return file_path.read_text(encoding="utf-8", errors="replace")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=50000, help="Number of files to generate.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        paths = create_files(root, args.files)
+        reader = FileContentReader(root, FileFilter(), exclude_hidden=False)
+
+        before: Counter = Counter()
+        start = time.perf_counter()
+        with count_calls(before):
+            legacy_contents = [legacy_read_file(path) for path in paths]
+        before_seconds = time.perf_counter() - start
+
+        after: Counter = Counter()
+        start = time.perf_counter()
+        with count_calls(after):
+            contents = [reader._read_file(path) for path in paths]
+        after_seconds = time.perf_counter() - start
+
+    assert contents == legacy_contents, "Single-open read path changed the file contents"
+    print(f"{'':<10}{'open':>10}{'stat':>10}{'fstat':>10}{'seconds':>10}")
+    for label, counts, seconds in (("before", before, before_seconds), ("after", after, after_seconds)):
+        print(f"{label:<10}{counts['open']:>10}{counts['stat']:>10}{counts['fstat']:>10}{seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark compressing the modules of the CPython standard library.
+
+Compares the original `ast.walk` based compression, which also compresses every
+definition nested inside bodies that are being removed, with the single pass
+`_BodyCompressor` used by `compress_python_module`. Both must produce the same source
+for every module.
+
+It also compares the two ways of producing the compressed source from a parsed module:
+unparsing the compressed AST, and splicing the original source ("slice" mode). Parsing
+is the same for both and reported separately.
+
+Run from the repository root:
+
+    PYTHONPATH=.:normyformy python benchmarks/bench_module_compressor.py --repeat 3
+"""
+
+import argparse
+import ast
+import pathlib
+import sysconfig
+import time
+from typing import Callable, Dict, List
+
+from normyformy.python_module_compressor import (
+    _compress_bodies,
+    _compress_by_slicing,
+    _compress_class,
+    _compress_function,
+)
+
+OPTIONS = {"keep_docstrings": True, "keep_class_attributes": True, "include_line_count": True}
+
+
+def walk_and_compress(
+    tree: ast.AST,
+    keep_docstrings: bool,
+    keep_class_attributes: bool,
+    include_line_count: bool,
+) -> None:
+    """The original implementation, visiting every node of the tree."""
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            _compress_function(node, keep_docstrings, include_line_count)
+        elif isinstance(node, ast.ClassDef):
+            _compress_class(
+                node,
+                keep_docstrings=keep_docstrings,
+                keep_class_attributes=keep_class_attributes,
+                include_line_count=include_line_count,
+            )
+
+
+def load_sources(directory: pathlib.Path, limit: int) -> Dict[pathlib.Path, str]:
+    """Read the Python modules below the directory that can be parsed."""
+    sources: Dict[pathlib.Path, str] = {}
+    for path in sorted(directory.rglob("*.py")):
+        if "site-packages" in path.parts or len(sources) >= limit:
+            continue
+        try:
+            source = path.read_text(encoding="utf-8")
+            ast.parse(source)
+        except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+            continue
+        sources[path] = source
+    return sources
+
+
+def run(sources: Dict[pathlib.Path, str], compress: Callable[..., None], repeat: int) -> tuple[float, List[str]]:
+    """Return the best time spent compressing all trees, and the unparsed output."""
+    best = float("inf")
+    outputs: List[str] = []
+    for _ in range(repeat):
+        trees = [ast.parse(source) for source in sources.values()]
+        start = time.perf_counter()
+        for tree in trees:
+            compress(tree, **OPTIONS)
+        best = min(best, time.perf_counter() - start)
+        outputs = [ast.unparse(tree) for tree in trees]
+    return best, outputs
+
+
+def run_output(sources: Dict[pathlib.Path, str], repeat: int) -> tuple[float, float, float]:
+    """Return the best parse time and time to produce the source by unparsing and by slicing."""
+    parse_best = unparse_best = slice_best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        trees = [ast.parse(source) for source in sources.values()]
+        parse_best = min(parse_best, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for source, tree in zip(sources.values(), trees):
+            _compress_by_slicing(source, tree, keep_imports=True, **OPTIONS)
+        slice_best = min(slice_best, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for tree in trees:
+            _compress_bodies(tree, **OPTIONS)
+            ast.unparse(tree)
+        unparse_best = min(unparse_best, time.perf_counter() - start)
+    return parse_best, unparse_best, slice_best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", type=pathlib.Path, default=pathlib.Path(sysconfig.get_paths()["stdlib"]))
+    parser.add_argument("--limit", type=int, default=2000, help="Maximum number of modules.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs, the best is reported.")
+    args = parser.parse_args()
+
+    sources = load_sources(args.directory, args.limit)
+    total_chars = sum(len(source) for source in sources.values())
+
+    walk_seconds, expected = run(sources, walk_and_compress, args.repeat)
+    single_pass_seconds, actual = run(sources, _compress_bodies, args.repeat)
+
+    mismatches = [path for path, a, b in zip(sources, expected, actual) if a != b]
+    assert not mismatches, f"Single pass output differs for {mismatches[:10]}"
+
+    print(f"{len(sources)} modules, {total_chars / 1e6:.1f}M characters")
+    print(f"ast.walk     {walk_seconds:>8.3f}s  {total_chars / walk_seconds / 1e6:>6.1f}M chars/s")
+    print(
+        f"single pass  {single_pass_seconds:>8.3f}s  {total_chars / single_pass_seconds / 1e6:>6.1f}M chars/s"
+        f"  ({walk_seconds / single_pass_seconds:.1f}x)"
+    )
+
+    parse_seconds, unparse_seconds, slice_seconds = run_output(sources, args.repeat)
+    print(f"parse        {parse_seconds:>8.3f}s  (shared by both modes)")
+    print(f"unparse mode {unparse_seconds:>8.3f}s")
+    print(f"slice mode   {slice_seconds:>8.3f}s  ({unparse_seconds / slice_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Select file contents for a report so that it fits a token budget.
+
+Files are visited in order of importance (see `determine_importance`). Each file is
+included in full if it fits the remaining budget, otherwise at the first compression
+level that fits (see `CompressionLevel`), and otherwise it is left out of the file
+contents (it is still listed in the directory tree).
+"""
+
+from __future__ import annotations
+
+import logging
+import pathlib
+from dataclasses import dataclass
+from typing import Callable, Literal, Optional, Sequence
+
+from normyformy.compressor_registry import DEFAULT_REGISTRY
+from normyformy.python_module_compressor import (
+    CompressionLevel,
+    FileLoaded,
+    determine_importance,
+    path_to_module_str,
+)
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN: int = 4
+"""Average number of characters per token used to estimate token counts."""
+
+DEFAULT_LEVELS: tuple[CompressionLevel, ...] = (
+    CompressionLevel.TRUNCATED_BODIES,
+    CompressionLevel.SIGNATURES_DOCSTRINGS,
+    CompressionLevel.SIGNATURES,
+    CompressionLevel.OUTLINE,
+)
+"""Compression levels tried in turn for files that do not fit the budget in full."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text from its length."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class FileSelection:
+    """How a single file is represented in the budgeted report."""
+
+    path: pathlib.Path
+    mode: Literal["full", "compressed", "omitted"]
+    tokens: int
+    """Estimated tokens the file uses in the report, 0 when omitted."""
+
+    importance: int
+    level: Optional[CompressionLevel] = None
+    """The compression level used, None when omitted."""
+
+    tokens_saved: int = 0
+    """Estimated tokens saved compared to including the full file."""
+
+
+class BudgetedReportBuilder:
+    """Greedily chooses between full content, compressed content or omission per file."""
+
+    def __init__(
+        self,
+        token_budget: int,
+        compress: Callable[[pathlib.Path, str, CompressionLevel], Optional[str]] = DEFAULT_REGISTRY.compress,
+        levels: Sequence[CompressionLevel] = DEFAULT_LEVELS,
+    ) -> None:
+        """
+        Initialize the BudgetedReportBuilder.
+
+        Args:
+            token_budget: Maximum number of tokens for the whole report.
+            compress: Returns a file compressed to a level, or None if it cannot be compressed.
+                Defaults to the compressors registered for the file extension.
+            levels: The compression levels to try, from the least to the most compressed. An
+                empty sequence disables compression.
+        """
+        self.token_budget = token_budget
+        self.compress = compress
+        self.levels = levels
+        self.selections: list[FileSelection] = []
+
+    def build(self, file_contents: dict[pathlib.Path, str], reserved_tokens: int = 0) -> dict[pathlib.Path, str]:
+        """Select the file contents to include in the report.
+
+        Args:
+            file_contents: Mapping of relative file paths to their full contents.
+            reserved_tokens: Tokens already used by the rest of the report, such as the
+                directory tree.
+
+        Returns:
+            The selected contents, in the original order of `file_contents`.
+        """
+        return self.build_from_loaded(load_files(file_contents), reserved_tokens)
+
+    def build_from_loaded(self, files_loaded: list[FileLoaded], reserved_tokens: int = 0) -> dict[pathlib.Path, str]:
+        """Select the file contents to include for files with known importance."""
+        remaining: int = self.token_budget - reserved_tokens
+        selected: dict[pathlib.Path, str] = {}
+        self.selections = []
+        for file in sorted(files_loaded, key=lambda file: (-file.importance, file.content_length)):
+            overhead: int = estimate_tokens(f"\n\nFile: {file.path}\n{'-' * 40}\n\n{'-' * 40}")
+            full_cost: int = overhead + estimate_tokens(file.content)
+            if full_cost <= remaining:
+                selected[file.path] = file.content
+                self._select(file, "full", full_cost, CompressionLevel.FULL, full_cost)
+                remaining -= full_cost
+                continue
+            for level in self.levels:
+                compressed = self.compress(file.path, file.content, level)
+                if compressed is None:
+                    break
+                cost: int = overhead + estimate_tokens(compressed)
+                if cost <= remaining:
+                    selected[file.path] = compressed
+                    self._select(file, "compressed", cost, level, full_cost)
+                    remaining -= cost
+                    break
+            if file.path not in selected:
+                self._select(file, "omitted", 0, None, full_cost)
+
+        omitted = [selection.path for selection in self.selections if selection.mode == "omitted"]
+        if omitted:
+            logger.info(f"Omitted {len(omitted)} files to fit the budget of {self.token_budget} tokens")
+        tokens_saved: int = sum(selection.tokens_saved for selection in self.selections)
+        logger.info(f"Compression and omission saved an estimated {tokens_saved} tokens")
+        order = {file.path: index for index, file in enumerate(files_loaded)}
+        return dict(sorted(selected.items(), key=lambda item: order[item[0]]))
+
+    def _select(
+        self,
+        file: FileLoaded,
+        mode: Literal["full", "compressed", "omitted"],
+        tokens: int,
+        level: Optional[CompressionLevel],
+        full_tokens: int,
+    ) -> None:
+        self.selections.append(
+            FileSelection(
+                path=file.path,
+                mode=mode,
+                tokens=tokens,
+                importance=file.importance,
+                level=level,
+                tokens_saved=full_tokens - tokens,
+            )
+        )
+
+
+def load_files(file_contents: dict[pathlib.Path, str]) -> list[FileLoaded]:
+    """Create FileLoaded objects with importance, without import information."""
+    files_loaded: list[FileLoaded] = [
+        FileLoaded(name=path_to_module_str(file_path), path=file_path, content=content, importance=-1)
+        for file_path, content in file_contents.items()
+    ]
+    return determine_importance(files_loaded)
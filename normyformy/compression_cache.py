@@ -0,0 +1,124 @@
+"""Persistent cache for compressed modules.
+
+Compressed modules are stored on disk under the SHA-256 hash of the source and the
+compression options, so unchanged files are not parsed again on the next run. Entries are
+sharded into sub directories by the first two characters of their key. Reading an entry
+updates its modification time, and `evict` removes the least recently used entries when
+the cache grows beyond its size or entry limits.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION: int = 2
+"""Part of every key, increase it when the compressed output changes for the same options."""
+
+DEFAULT_MAX_BYTES: int = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRIES: int = 100_000
+
+
+class CompressionCache:
+    """Content addressed on-disk cache of compressed module sources."""
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        """
+        Initialize the CompressionCache.
+
+        Args:
+            directory: Directory holding the cache entries, created when needed.
+            max_bytes: Maximum total size of the entries kept by `evict`.
+            max_entries: Maximum number of entries kept by `evict`.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(source: str, options: dict[str, Any]) -> str:
+        """Return the cache key of a module compressed with the given options."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([CACHE_VERSION, options], sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf-8", errors="surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached output for the key, or None if it is not cached."""
+        path = self._path(key)
+        try:
+            content = path.read_text(encoding="utf-8")
+            os.utime(path)
+        except (OSError, UnicodeDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """Store the output for the key. Failures to write are logged and ignored."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see partial entries
+            fd, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Could not write compression cache entry {path}: {e}")
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until the cache is within its limits.
+
+        Returns:
+            The number of entries removed.
+        """
+        entries: list[tuple[float, int, str]] = []
+        try:
+            shards = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return 0
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes and len(entries) - removed <= self.max_entries:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} entries from the compression cache {self.directory}")
+        return removed
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / key[2:]
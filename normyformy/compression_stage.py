@@ -0,0 +1,202 @@
+"""Compression stage of the report pipeline.
+
+Runs `compress_python_module` over all Python files of a report in a process pool, since
+parsing and unparsing the AST is CPU-bound and does not scale with threads. Files of other
+languages with a compressor in the `CompressorRegistry` are compressed to an outline
+level. Files that cannot be parsed keep their original content. With a `CompressionCache`, only modules
+whose source or options changed since an earlier run are compressed.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from normyformy.compression_cache import CompressionCache
+from normyformy.compressor_registry import DEFAULT_REGISTRY, CompressorRegistry
+from normyformy.python_module_compressor import CompressionLevel, CompressionMode, compress_python_module
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompressionOptions:
+    """Options for the compression stage, passed on to `compress_python_module`."""
+
+    keep_docstrings: bool = False
+    keep_imports: bool = False
+    include_line_count: bool = True
+    keep_class_attributes: bool = True
+    mode: CompressionMode = "unparse"
+    """Use "slice" to keep the original formatting and comments outside removed bodies."""
+
+    max_workers: Optional[int] = None
+    """Number of worker processes, defaults to the number of CPUs. Use 1 to compress in process."""
+
+    chunksize: int = 8
+    """Number of files sent to a worker process at a time."""
+
+    cache_directory: Optional[pathlib.Path] = None
+    """Directory of a persistent `CompressionCache`, no caching when None."""
+
+    outline_level: Optional[CompressionLevel] = CompressionLevel.SIGNATURES_DOCSTRINGS
+    """Level for files of other languages with a registered compressor, None keeps them unchanged."""
+
+    def compressor_kwargs(self) -> dict[str, Any]:
+        """Return the keyword arguments for `compress_python_module`."""
+        kwargs = asdict(self)
+        del kwargs["max_workers"], kwargs["chunksize"], kwargs["cache_directory"], kwargs["outline_level"]
+        return kwargs
+
+
+@dataclass
+class CompressionStats:
+    """Statistics collected by a run of the compression stage."""
+
+    files_compressed: int = 0
+    files_failed: int = 0
+    """Python files that could not be parsed and were kept uncompressed."""
+
+    files_skipped: int = 0
+    """Files without a compressor."""
+
+    cache_hits: int = 0
+
+    original_chars: int = 0
+    compressed_chars: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        """Return a one line summary of the run."""
+        ratio: float = self.compressed_chars / self.original_chars if self.original_chars else 1.0
+        return (
+            f"Compressed {self.files_compressed} files ({self.files_failed} failed, "
+            f"{self.files_skipped} skipped, {self.cache_hits} cached) from {self.original_chars} to {self.compressed_chars} "
+            f"characters ({ratio:.0%}) in {self.seconds:.2f}s"
+        )
+
+
+def _compress_source(
+    file_path: pathlib.Path,
+    source: str,
+    kwargs: dict[str, Any],
+    registry: CompressorRegistry,
+    outline_level: Optional[CompressionLevel],
+) -> Optional[str]:
+    """Compress a single file, returning None if it cannot be parsed."""
+    if file_path.suffix != ".py":
+        return registry.compress(file_path, source, outline_level) if outline_level is not None else None
+    try:
+        return compress_python_module(source, **kwargs)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+
+def _compress_batch(
+    files: list[tuple[pathlib.Path, str]],
+    kwargs: dict[str, Any],
+    registry: CompressorRegistry,
+    outline_level: Optional[CompressionLevel],
+) -> list[Optional[str]]:
+    """Compress a batch of files in a worker process."""
+    return [_compress_source(file_path, source, kwargs, registry, outline_level) for file_path, source in files]
+
+
+class CompressionStage:
+    """Compresses the files of a report, falling back to the original per file."""
+
+    def __init__(
+        self,
+        options: CompressionOptions,
+        cache: Optional[CompressionCache] = None,
+        registry: CompressorRegistry = DEFAULT_REGISTRY,
+    ) -> None:
+        """
+        Initialize the CompressionStage.
+
+        Args:
+            options: The compression options.
+            cache: Cache of compressed modules, defaults to a cache in `options.cache_directory`.
+            registry: Compressors for files other than Python modules. The registry is sent to
+                the worker processes, so its compressors must be picklable.
+        """
+        self.options = options
+        self.registry = registry
+        if cache is None and options.cache_directory is not None:
+            cache = CompressionCache(options.cache_directory)
+        self.cache = cache
+        self.stats = CompressionStats()
+
+    def run(self, file_contents: dict[pathlib.Path, str]) -> dict[pathlib.Path, str]:
+        """Compress all files with a compressor.
+
+        Args:
+            file_contents: Mapping of relative file paths to their contents.
+
+        Returns:
+            The file contents in the same order, with the files compressed.
+        """
+        start: float = time.perf_counter()
+        self.stats = CompressionStats()
+        files: list[tuple[pathlib.Path, str]] = [
+            (path, content) for path, content in file_contents.items() if self._is_compressed(path)
+        ]
+        compressed: list[Optional[str]] = self._compress_cached(files)
+
+        result: dict[pathlib.Path, str] = dict(file_contents)
+        for (path, source), output in zip(files, compressed):
+            self.stats.original_chars += len(source)
+            if output is None:
+                logger.warning(f"Could not compress {path}, keeping the original content")
+                self.stats.files_failed += 1
+                self.stats.compressed_chars += len(source)
+                continue
+            result[path] = output
+            self.stats.files_compressed += 1
+            self.stats.compressed_chars += len(output)
+        self.stats.files_skipped = len(file_contents) - len(files)
+        self.stats.seconds = time.perf_counter() - start
+        logger.info(self.stats.summary())
+        return result
+
+    def _is_compressed(self, file_path: pathlib.Path) -> bool:
+        if file_path.suffix == ".py":
+            return True
+        return self.options.outline_level is not None and self.registry.get(file_path) is not None
+
+    def _cache_options(self, file_path: pathlib.Path) -> dict[str, Any]:
+        """Return the options that determine the compressed output of a file."""
+        if file_path.suffix == ".py":
+            return {"suffix": file_path.suffix, **self.options.compressor_kwargs()}
+        return {"suffix": file_path.suffix.lower(), "level": int(self.options.outline_level or 0)}
+
+    def _compress_cached(self, files: list[tuple[pathlib.Path, str]]) -> list[Optional[str]]:
+        """Compress the files, taking unchanged files from the cache."""
+        if self.cache is None:
+            return self._compress_all(files)
+        keys: list[str] = [self.cache.key(source, self._cache_options(path)) for path, source in files]
+        results: list[Optional[str]] = [self.cache.get(key) for key in keys]
+        missing: list[int] = [i for i, result in enumerate(results) if result is None]
+        self.stats.cache_hits = len(files) - len(missing)
+        for i, output in zip(missing, self._compress_all([files[i] for i in missing])):
+            results[i] = output
+            if output is not None:
+                self.cache.put(keys[i], output)
+        self.cache.evict()
+        return results
+
+    def _compress_all(self, files: list[tuple[pathlib.Path, str]]) -> list[Optional[str]]:
+        args = (self.options.compressor_kwargs(), self.registry, self.options.outline_level)
+        max_workers: int = self.options.max_workers or os.cpu_count() or 1
+        if max_workers <= 1 or len(files) <= self.options.chunksize:
+            return _compress_batch(files, *args)
+        chunksize: int = self.options.chunksize
+        batches = [files[i:i + chunksize] for i in range(0, len(files), chunksize)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(_compress_batch, batches, *([arg] * len(batches) for arg in args))
+            return [output for batch in results for output in batch]
@@ -0,0 +1,84 @@
+"""Registry of compressors by file extension.
+
+A compressor takes the content of a file and a `CompressionLevel`, and returns the
+compressed content. The default registry has the AST based compressor for Python and the
+outline compressors of `outline_compressors` for common other languages. Other
+compressors can be registered for additional extensions.
+"""
+
+from __future__ import annotations
+
+import logging
+import pathlib
+from typing import Callable, Iterable, Optional
+
+from normyformy.outline_compressors import compress_brace_language, compress_javascript, compress_rust, compress_yaml
+from normyformy.python_module_compressor import CompressionLevel, compress_to_level
+
+logger = logging.getLogger(__name__)
+
+Compressor = Callable[[str, CompressionLevel], str]
+"""Compresses file content to a level, raising ValueError or SyntaxError if it cannot."""
+
+JAVASCRIPT_EXTENSIONS: tuple[str, ...] = (".ts", ".tsx", ".mts", ".cts", ".js", ".jsx", ".mjs", ".cjs")
+RUST_EXTENSIONS: tuple[str, ...] = (".rs",)
+BRACE_LANGUAGE_EXTENSIONS: tuple[str, ...] = (
+    ".cs", ".go", ".java", ".kt", ".scala", ".swift", ".c", ".h", ".cpp", ".hpp", ".cc",
+)
+YAML_EXTENSIONS: tuple[str, ...] = (".yaml", ".yml")
+
+
+def compress_python(content: str, level: CompressionLevel) -> str:
+    """Compress a Python module, raising SyntaxError if it cannot be parsed."""
+    return compress_to_level(content, level).content
+
+
+class CompressorRegistry:
+    """Maps file extensions to compressors."""
+
+    def __init__(self) -> None:
+        self._compressors: dict[str, Compressor] = {}
+
+    @property
+    def extensions(self) -> frozenset[str]:
+        """Return the extensions with a registered compressor."""
+        return frozenset(self._compressors)
+
+    def register(self, extensions: Iterable[str], compressor: Compressor) -> None:
+        """Register a compressor for extensions such as ".ts", replacing existing ones."""
+        for extension in extensions:
+            self._compressors[extension.lower()] = compressor
+
+    def get(self, file_path: pathlib.Path) -> Optional[Compressor]:
+        """Return the compressor for a file, or None if there is none for its extension."""
+        return self._compressors.get(file_path.suffix.lower())
+
+    def compress(self, file_path: pathlib.Path, content: str, level: CompressionLevel) -> Optional[str]:
+        """Compress a file to a level.
+
+        Returns:
+            The compressed content, or None if there is no compressor for the file or it
+            cannot be compressed.
+        """
+        compressor = self.get(file_path)
+        if compressor is None:
+            return None
+        try:
+            return compressor(content, level)
+        except (SyntaxError, ValueError, RecursionError) as e:
+            logger.debug(f"Could not compress {file_path}: {e}")
+            return None
+
+
+def create_default_registry() -> CompressorRegistry:
+    """Create a registry with the built-in compressors."""
+    registry = CompressorRegistry()
+    registry.register([".py"], compress_python)
+    registry.register(JAVASCRIPT_EXTENSIONS, compress_javascript)
+    registry.register(RUST_EXTENSIONS, compress_rust)
+    registry.register(BRACE_LANGUAGE_EXTENSIONS, compress_brace_language)
+    registry.register(YAML_EXTENSIONS, compress_yaml)
+    return registry
+
+
+DEFAULT_REGISTRY: CompressorRegistry = create_default_registry()
@@ -4,18 +4,35 @@ This module provides functionality to filter files and directories based on igno
 specified in `.copconignore` files. It also supports a `.copcontarget` file to target 
 specific directories and files.
 
+Besides the internal and user-specified ignore files, `.copconignore` files found in
+subdirectories during a scan apply to that directory and everything below it, with the
+same precedence as nested `.gitignore` files: deeper files override shallower ones.
+
 NOTE: This module is a modified version of Copcon module: copcon/core/file_filter.py
 """
 
 from pathlib import Path
-from typing import Optional
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
 import pathspec
+from core.pattern_matcher import CompiledMatcher
 from exceptions import FileReadError
 import importlib.resources as pkg_resources
 import logging
 
 logger = logging.getLogger(__name__)
 
+IGNORE_FILE_NAME: str = ".copconignore"
+GITIGNORE_FILE_NAME: str = ".gitignore"
+
+
+@dataclass(frozen=True)
+class _DirectoryRules:
+    """Compiled patterns of an ignore file, relative to the directory containing it."""
+
+    base: Path
+    matcher: CompiledMatcher
+
 
 class FileFilter:
     """Filters files and directories based on ignore and target patterns.
@@ -28,6 +45,7 @@ class FileFilter:
         self,
         user_ignore_path: Optional[Path] = None,
         user_target_path: Optional[Path] = None,
+        ignore_file_names: Tuple[str, ...] = (IGNORE_FILE_NAME,),
     ):
         """
         Initialize the FileFilter.
@@ -35,13 +53,24 @@ class FileFilter:
         Args:
             user_ignore_path (Path, optional): Path to a user-specified `.copconignore` file.
             user_target_path (Path, optional): Path to a user-specified `.copcontarget` file.
+            ignore_file_names (Tuple[str, ...]): Names of the nested ignore files applied during
+                a scan. When a directory holds several, later names take precedence.
 
         Raises:
             FileReadError: If there is an error reading ignore or target files.
         """
+        # Decisions are cached per directory, keyed by entry name with a trailing "/" for directories
+        self._decisions: Dict[Path, Dict[str, bool]] = {}
+        self._pruned_directories: Dict[Path, bool] = {}
+        # Stack of nested ignore files that apply to each registered directory, deepest last.
+        # Directories without their own ignore file share the stack of their parent.
+        self._rule_stacks: Dict[Path, Tuple[_DirectoryRules, ...]] = {}
+        self.ignore_file_names = ignore_file_names
+
         # Load internal patterns
         self.ignore_spec = self._load_internal_copconignore()
         self.user_defined = False  # Flag to indicate if user-defined .copconignore was loaded
+        self._user_ignore_path: Optional[Path] = None
 
         # Load user-specified ignore patterns if any
         if user_ignore_path and user_ignore_path.exists():
@@ -51,6 +80,7 @@ class FileFilter:
                 user_spec = pathspec.PathSpec.from_lines("gitwildmatch", user_patterns)
                 self.ignore_spec = self.ignore_spec + user_spec  # Merge user patterns
                 self.user_defined = True  # Set flag as user-defined .copconignore is loaded
+                self._user_ignore_path = user_ignore_path.resolve()
                 logger.debug(f"Loaded user ignore patterns from {user_ignore_path}")
             except Exception as e:
                 logger.error(f"Error reading user ignore file {user_ignore_path}: {e}")
@@ -71,6 +101,13 @@ class FileFilter:
                 logger.error(f"Error reading user target file {user_target_path}: {e}")
                 raise FileReadError(f"Error reading user target file {user_target_path}: {e}")
 
+        # Index the merged patterns by the literal components and extensions they require,
+        # so matching a path only runs the regular expressions of the candidate patterns
+        self._ignore_matcher = CompiledMatcher.from_spec(self.ignore_spec)
+        self._target_matcher = None
+        if self.target_spec is not None:
+            self._target_matcher = CompiledMatcher.from_spec(self.target_spec)
+
     def _load_internal_copconignore(self) -> pathspec.PathSpec:
         """Load internal ignore patterns from the package's .copconignore file.
 
@@ -91,28 +128,122 @@ class FileFilter:
             logger.error(f"Error loading internal .copconignore: {e}")
             raise FileReadError(f"Error loading internal .copconignore: {e}")
 
-    def should_ignore(self, path: Path) -> bool:
+    def should_ignore(self, path: Path, is_dir: Optional[bool] = None) -> bool:
         """Determine whether a given file or directory should be ignored.
 
+        Decisions are cached, and everything below a directory matched by the ignore
+        patterns is ignored without matching the patterns again.
+
         Args:
             path (Path): The file or directory path to check.
+            is_dir (bool, optional): Whether the path is a directory. When not given the
+                file system is queried.
 
         Returns:
             bool: True if the path should be ignored, False otherwise.
         """
-        path_str = str(path.relative_to(path.anchor))
-        if path.is_dir():
-            path_str += "/"
+        if is_dir is None:
+            is_dir = path.is_dir()
+        key = path.name + "/" if is_dir else path.name
+        decisions = self._decisions.setdefault(path.parent, {})
+        decision = decisions.get(key)
+        if decision is None:
+            decision = self._match_ignore(path, is_dir)
+            decisions[key] = decision
+        return decision
+
+    def _match_ignore(self, path: Path, is_dir: bool) -> bool:
+        if self._pruned_directories.get(path.parent, False):
+            return True
+
+        path_str = self._path_str(path, is_dir)
 
         # Apply .copcontarget: if target_spec exists and path does not match, ignore it.
-        if self.target_spec is not None and not self.target_spec.match_file(path_str):
+        if self._target_matcher is not None and not self._target_matcher.match_file(path_str):
             return True
 
+        return self._is_ignored(path, path_str, is_dir)
+
+    def _is_ignored(self, path: Path, path_str: str, is_dir: bool) -> bool:
+        """Check the nested ignore files from deepest to shallowest, then the global patterns."""
+        for rules in reversed(self._rules_for(path.parent)):
+            relative = path.relative_to(rules.base).as_posix()
+            decision = rules.matcher.check_file(relative + "/" if is_dir else relative)
+            if decision is not None:
+                return decision
+
         # Check against internal and user-specified ignore patterns
-        if self.ignore_spec.match_file(path_str):
-            return True
+        return self._ignore_matcher.match_file(path_str)
 
-        return False
+    def should_prune_directory(self, path: Path) -> bool:
+        """Determine whether a directory and everything below it can be skipped.
+
+        Only ignore patterns are considered, as `.copcontarget` patterns select files and a
+        directory that does not match them may still contain targeted files.
+
+        Args:
+            path (Path): The directory path to check.
+
+        Returns:
+            bool: True if the directory is ignored and should not be descended into.
+        """
+        pruned = self._pruned_directories.get(path)
+        if pruned is None:
+            pruned = self._pruned_directories.get(path.parent, False) or self._is_ignored(
+                path, self._path_str(path, is_dir=True), is_dir=True
+            )
+            self._pruned_directories[path] = pruned
+        return pruned
+
+    def register_directory(self, directory: Path, ignore_files: Iterable[str]) -> None:
+        """Register a scanned directory and the ignore files it contains.
+
+        The rule stack of the directory is its parent's stack, extended with the compiled
+        patterns of its own ignore files. Directories must be registered before their
+        parent's entries are checked, which a top-down scan guarantees. The user-specified
+        ignore file is already part of the global patterns and is not applied again.
+
+        Args:
+            directory (Path): The scanned directory.
+            ignore_files (Iterable[str]): Names of the ignore files present in the directory.
+
+        Raises:
+            FileReadError: If there is an error reading a nested ignore file.
+        """
+        stack = self._rules_for(directory.parent) if directory.parent != directory else ()
+        for name in sorted(ignore_files, key=self.ignore_file_names.index):
+            if self._user_ignore_path is not None and (directory / name).resolve() == self._user_ignore_path:
+                continue
+            patterns = self._read_patterns(directory / name)
+            if patterns:
+                matcher = CompiledMatcher.from_spec(pathspec.PathSpec.from_lines("gitwildmatch", patterns))
+                stack = stack + (_DirectoryRules(base=directory, matcher=matcher),)
+                logger.debug(f"Loaded nested ignore patterns from {directory / name}")
+        self._rule_stacks[directory] = stack
+
+    def _rules_for(self, directory: Path) -> Tuple[_DirectoryRules, ...]:
+        """Return the rule stack of the closest registered directory."""
+        current = directory
+        while current not in self._rule_stacks:
+            if current.parent == current:
+                return ()
+            current = current.parent
+        return self._rule_stacks[current]
+
+    @staticmethod
+    def _read_patterns(path: Path) -> List[str]:
+        try:
+            with path.open() as f:
+                return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        except Exception as e:
+            logger.error(f"Error reading ignore file {path}: {e}")
+            raise FileReadError(f"Error reading ignore file {path}: {e}")
+
+    @staticmethod
+    def _path_str(path: Path, is_dir: bool) -> str:
+        """Return the path relative to its anchor, with a trailing "/" for directories."""
+        path_str = str(path)[len(path.anchor):]
+        return path_str + "/" if is_dir else path_str
 
     def has_user_defined_ignore(self) -> bool:
         """Check if a user-defined .copconignore was loaded.
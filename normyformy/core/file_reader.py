@@ -6,61 +6,194 @@ handling both text and binary files appropriately.
 NOTE: This module is a modified version of Copcon module: copcon/core/file_reader.py
 """
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from core.file_filter import FileFilter
+from core.scanner import DirectoryScanner, DirectorySnapshot, ScannedEntry
 from exceptions import FileReadError
+import io
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+BINARY_SNIFF_BYTES: int = 1024
+"""Number of leading bytes inspected for NUL bytes to detect binary files."""
+
+READ_AHEAD_PER_WORKER: int = 4
+"""Number of files read ahead per worker when reading concurrently."""
+
 class FileContentReader:
-    def __init__(self, base_directory: Path, file_filter: FileFilter, exclude_hidden: bool):
+    def __init__(
+        self,
+        base_directory: Path,
+        file_filter: FileFilter,
+        exclude_hidden: bool,
+        snapshot: Optional[DirectorySnapshot] = None,
+        max_workers: Optional[int] = None,
+        max_file_bytes: Optional[int] = None,
+        max_total_bytes: Optional[int] = None,
+    ):
+        """
+        Initialize the FileContentReader.
+
+        Args:
+            base_directory (Path): The directory to read files from.
+            file_filter (FileFilter): The file filter to determine which files to read.
+            exclude_hidden (bool): Whether to skip hidden files and directories.
+            snapshot (DirectorySnapshot, optional): A pre-scanned snapshot of the directory.
+            max_workers (int, optional): Number of threads used to read files concurrently.
+                Files are read one by one when not set or set to 1.
+            max_file_bytes (int, optional): Maximum number of bytes read from a single file.
+                Larger files are reduced to a head and tail snippet around a truncation marker.
+            max_total_bytes (int, optional): Maximum number of content bytes read in total.
+                Once a file would exceed the budget, it and all following files are omitted
+                and counted in `omitted_summary`.
+        """
         self.base_directory = base_directory
         self.file_filter = file_filter
         self.exclude_hidden = exclude_hidden
+        self.snapshot = snapshot
+        self.max_workers = max_workers
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.omitted_count = 0
 
     def read_all(self) -> Dict[Path, str]:
-        file_contents = {}
+        return dict(self.iter_contents())
+
+    def iter_contents(self) -> Iterator[Tuple[Path, str]]:
+        """Yield (relative path, content) pairs, reading each file only when it is requested.
+
+        Errors are collected while iterating and raised together once all files are yielded.
+
+        Yields:
+            Tuple[Path, str]: The path relative to the base directory and the file content.
+
+        Raises:
+            FileReadError: If any file could not be read.
+        """
+        if self.snapshot is None:
+            self.snapshot = DirectoryScanner(self.base_directory, self.file_filter).scan()
+        files: List[ScannedEntry] = []
+        for entry in self.snapshot.iter_files():
+            file_path = entry.path
+            if self.exclude_hidden and self._is_hidden(file_path):
+                continue
+            if self.file_filter.should_ignore(file_path, is_dir=False):
+                continue
+            files.append(entry)
+
         errors: List[FileReadError] = []
-        for file_path in self.base_directory.rglob("*"):
-            if file_path.is_file():
-                if self.exclude_hidden and self._is_hidden(file_path):
-                    continue
-                if self.file_filter.should_ignore(file_path):
-                    continue
-                try:
-                    content = self._read_file(file_path)
-                    relative_path = file_path.relative_to(self.base_directory)
-                    file_contents[relative_path] = content
-                except FileReadError as e:
-                    logger.warning(f"Skipping file {file_path}: {e}")
-                    errors.append(e)
+        total_bytes = 0
+        self.omitted_count = 0
+        # Results are returned in the order of the files, also when reading concurrently.
+        # The iterator is lazy, so files after the total budget is exhausted are never read
+        # (apart from the small read-ahead window when reading concurrently).
+        results = self._read_files([entry.path for entry in files])
+        for index, entry in enumerate(files):
+            file_path = entry.path
+            if self.max_total_bytes is not None and total_bytes + self._expected_bytes(entry) > self.max_total_bytes:
+                # The size from the snapshot already exceeds the budget, the file is not read
+                self._exhaust_budget(file_path, len(files) - index)
+                break
+            result = next(results)
+            if isinstance(result, FileReadError):
+                logger.warning(f"Skipping file {file_path}: {result}")
+                errors.append(result)
+                continue
+            if self.max_total_bytes is not None:
+                total_bytes += len(result.encode("utf-8"))
+                if total_bytes > self.max_total_bytes:
+                    self._exhaust_budget(file_path, len(files) - index)
+                    break
+            yield file_path.relative_to(self.base_directory), result
+        results.close()
         if errors:
             raise FileReadError(f"Encountered errors while reading files: {[str(e) for e in errors]}")
-        return file_contents
+
+    def omitted_summary(self) -> str:
+        """Return a line summarizing the files omitted by the total budget, empty if none were omitted."""
+        if not self.omitted_count:
+            return ""
+        return f"[Omitted {self.omitted_count} files: total size budget of {self.max_total_bytes} bytes exhausted]"
+
+    def _expected_bytes(self, entry: ScannedEntry) -> int:
+        """Return the size the file is expected to add, limited by the per-file cap."""
+        if self.max_file_bytes is None:
+            return entry.size
+        return min(entry.size, self.max_file_bytes)
+
+    def _exhaust_budget(self, file_path: Path, remaining: int) -> None:
+        logger.warning(f"Total size budget of {self.max_total_bytes} bytes exhausted at {file_path}")
+        self.omitted_count = remaining
+
+    def _read_files(self, file_paths: List[Path]) -> Iterator[Union[str, FileReadError]]:
+        if self.max_workers is None or self.max_workers <= 1:
+            yield from map(self._read_file_or_error, file_paths)
+            return
+        # Only a bounded window of reads is in flight, so results are not buffered without
+        # limit when they are consumed slower than they are read
+        window = self.max_workers * READ_AHEAD_PER_WORKER
+        remaining = iter(file_paths)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque(executor.submit(self._read_file_or_error, path) for path in islice(remaining, window))
+            while pending:
+                result = pending.popleft().result()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending.append(executor.submit(self._read_file_or_error, next_path))
+                yield result
+
+    def _read_file_or_error(self, file_path: Path) -> Union[str, FileReadError]:
+        try:
+            return self._read_file(file_path)
+        except FileReadError as e:
+            return e
 
     def _is_hidden(self, path: Path) -> bool:
         return any(part.startswith(".") for part in path.parts)
 
     def _read_file(self, file_path: Path) -> str:
         try:
-            if self._is_binary(file_path):
-                size = file_path.stat().st_size
-                return f"[Binary file] Size: {size} bytes"
-            else:
-                return file_path.read_text(encoding="utf-8", errors="replace")
+            with file_path.open('rb') as f:
+                # Peek fills the read buffer without consuming it, so the text wrapper
+                # decodes from the start of the same buffer instead of reopening the file
+                chunk = f.peek(BINARY_SNIFF_BYTES)[:BINARY_SNIFF_BYTES]
+                if self._is_binary(chunk):
+                    size = os.fstat(f.fileno()).st_size
+                    return f"[Binary file] Size: {size} bytes"
+                if self.max_file_bytes is not None:
+                    size = os.fstat(f.fileno()).st_size
+                    if size > self.max_file_bytes:
+                        return self._read_truncated(f, size)
+                with io.TextIOWrapper(f, encoding="utf-8", errors="replace") as text:
+                    return text.read()
         except Exception as e:
             logger.error(f"Error reading file {file_path}: {e}")
             raise FileReadError(f"Error reading file {file_path}: {e}")
 
-    def _is_binary(self, file_path: Path) -> bool:
-        try:
-            with file_path.open('rb') as f:
-                chunk = f.read(1024)
-                if b'\0' in chunk:
-                    return True
-            return False
-        except Exception as e:
-            logger.error(f"Error detecting binary for file {file_path}: {e}")
-            raise FileReadError(f"Error detecting binary for file {file_path}: {e}")
+    def _is_binary(self, chunk: bytes) -> bool:
+        return b'\0' in chunk
+
+    def _read_truncated(self, f: io.BufferedReader, size: int) -> str:
+        """Read only the head and tail of an open file, keeping `max_file_bytes` in total."""
+        head_bytes = self.max_file_bytes // 2
+        tail_bytes = self.max_file_bytes - head_bytes
+        head = f.read(head_bytes)
+        f.seek(size - tail_bytes)
+        tail = f.read(tail_bytes)
+        truncated = size - head_bytes - tail_bytes
+        return (
+            self._decode(head)
+            + f"\n[... truncated {truncated} bytes ...]\n"
+            + self._decode(tail)
+        )
+
+    def _decode(self, data: bytes) -> str:
+        # Match the universal newline handling of text mode reads
+        text = data.decode("utf-8", errors="replace")
+        return text.replace("\r\n", "\n").replace("\r", "\n")
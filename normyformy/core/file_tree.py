@@ -9,6 +9,7 @@ NOTE: This module is a modified version of Copcon module: copcon/core/file_tree.
 from pathlib import Path
 from typing import Optional
 from core.file_filter import FileFilter
+from core.scanner import DirectoryScanner, DirectorySnapshot
 
 class FileTreeGenerator:
     """Generates a tree-like directory structure for a given directory.
@@ -22,6 +23,7 @@ class FileTreeGenerator:
         directory: Path,
         depth: int,
         file_filter: FileFilter,
+        snapshot: Optional[DirectorySnapshot] = None,
     ):
         """
         Initialize the FileTreeGenerator.
@@ -30,6 +32,8 @@ class FileTreeGenerator:
             directory (Path): The root directory to generate the tree from.
             depth (int): The maximum depth to traverse (-1 for unlimited).
             file_filter (FileFilter): The file filter to determine which files and directories to include.
+            snapshot (DirectorySnapshot, optional): A pre-scanned snapshot of the directory. The
+                directory is scanned on the first call to `generate` if not provided.
 
         Attributes:
             directory_count (int): The total number of directories processed.
@@ -38,6 +42,7 @@ class FileTreeGenerator:
         self.directory = directory
         self.depth = depth
         self.file_filter = file_filter
+        self.snapshot = snapshot
         self.directory_count = 0  # Initialize directory count
         self.file_count = 0       # Initialize file count
 
@@ -56,42 +61,47 @@ class FileTreeGenerator:
         if current_dir is None:
             current_dir = self.directory
             self.directory_count = 1  # Count the root directory
+            if self.snapshot is None:
+                self.snapshot = DirectoryScanner(self.directory, self.file_filter).scan()
 
         if self.depth != -1 and current_depth > self.depth:
             return ""
 
         output = []
         try:
-            contents = sorted(current_dir.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower()))
-        except Exception as e:
+            contents = self.snapshot.children(current_dir)
+        except OSError as e:
             output.append(f"{prefix}Error accessing {current_dir}: {e}")
             return "\n".join(output)
 
         # Build list of items to show:
         visible_items = []
-        for path in contents:
-            if path.is_dir():
-                visible_items.append(path)
-            elif path.is_file():
-                if not self.file_filter.should_ignore(path):
-                    visible_items.append(path)
-
-        for i, path in enumerate(visible_items):
+        for entry in contents:
+            if entry.is_dir:
+                visible_items.append(entry)
+            elif entry.is_file:
+                if not self.file_filter.should_ignore(entry.path, is_dir=False):
+                    visible_items.append(entry)
+
+        for i, entry in enumerate(visible_items):
             is_last = i == len(visible_items) - 1
             connector = "└── " if is_last else "├── "
-            if path.is_dir():
+            if entry.is_dir:
                 # Always count directories
                 self.directory_count += 1
-                if self.file_filter.should_ignore(path):
+                if self.file_filter.should_ignore(entry.path, is_dir=True):
                     # Mark the directory as ignored and do not descend
-                    output.append(f"{prefix}{connector}{path.name}/ (contents not displayed)")
+                    output.append(f"{prefix}{connector}{entry.name}/ (contents not displayed)")
+                elif entry.is_symlink and not self.snapshot.is_scanned(entry.path):
+                    # Symbolic link pointing to a parent directory, following it would never end
+                    output.append(f"{prefix}{connector}{entry.name}/ (symbolic link to a parent directory, not followed)")
                 else:
-                    output.append(f"{prefix}{connector}{path.name}/")
+                    output.append(f"{prefix}{connector}{entry.name}/")
                     extension = "    " if is_last else "│   "
-                    subtree = self.generate(path, current_depth + 1, prefix + extension)
+                    subtree = self.generate(entry.path, current_depth + 1, prefix + extension)
                     if subtree:
                         output.append(subtree)
             else:
                 self.file_count += 1  # Count file
-                output.append(f"{prefix}{connector}{path.name}")
+                output.append(f"{prefix}{connector}{entry.name}")
         return "\n".join(output)
@@ -0,0 +1,324 @@
+"""Git Index Enumeration.
+
+This module provides functionality to list the files of a git checkout from its index
+(`.git/index`) instead of walking the working tree. The index is parsed in pure Python,
+so no git executable is needed, and untracked and ignored files are never listed. Every
+tracked file is checked once in the working tree, so files deleted but not yet staged
+are left out.
+
+Index versions 2, 3 and 4 are supported for repositories using SHA-1 object names.
+Split indexes (`git update-index --split-index`) and SHA-256 repositories are not
+supported and raise `FileReadError`, like corrupt or truncated index files.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import hashlib
+import os
+import stat
+import struct
+import logging
+from core.file_filter import FileFilter
+from core.scanner import DirectorySnapshot, ScannedEntry
+from exceptions import FileReadError
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">4sLL")
+# ctime (s, ns), mtime (s, ns), dev, ino, mode, uid, gid, size, 20 byte object name, flags
+_ENTRY = struct.Struct(">LLLLLLLLLL20sH")
+
+_FLAG_EXTENDED = 0x4000
+_FLAG_STAGE_MASK = 0x3000
+_FLAG_NAME_MASK = 0x0FFF
+_EXTENDED_FLAG_SKIP_WORKTREE = 0x4000
+
+_MODE_TYPE_MASK = 0o170000
+_MODE_REGULAR = 0o100000
+_MODE_SYMLINK = 0o120000
+
+_SHA1_SIZE = 20
+_SHA256_SIZE = 32
+_EXTENSION_HEADER = struct.Struct(">4sL")
+_EXTENSION_SPLIT_INDEX = b"link"
+
+
+@dataclass(frozen=True)
+class GitIndexEntry:
+    """A file listed in the git index."""
+
+    path: str
+    """Path relative to the repository root, using "/" as separator."""
+
+    mode: int
+    size: int
+    mtime: float
+
+
+def discover_git_repository(directory: Path) -> Optional[Tuple[Path, Path]]:
+    """Walk upward from 'directory' to find the git repository containing it.
+
+    Args:
+        directory (Path): The directory to start from.
+
+    Returns:
+        Optional[Tuple[Path, Path]]: The working tree root and the git directory, or None
+            if the directory is not inside a git checkout.
+    """
+    current = directory.resolve()
+    while True:
+        dot_git = current / ".git"
+        if dot_git.is_dir():
+            return current, dot_git
+        if dot_git.is_file():
+            # Worktrees and submodules use a file pointing to the actual git directory
+            content = dot_git.read_text(encoding="utf-8").strip()
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                return current, (current / git_dir).resolve()
+        if current.parent == current:
+            return None
+        current = current.parent
+
+
+def read_git_index(index_path: Path) -> List[GitIndexEntry]:
+    """Parse the entries of a git index file.
+
+    Unmerged entries are reported once, and entries that are not checked out (submodules,
+    sparse checkout entries and sparse directories) are skipped.
+
+    Args:
+        index_path (Path): Path to the index file, usually `.git/index`.
+
+    Returns:
+        List[GitIndexEntry]: The files listed in the index, sorted by path.
+
+    Raises:
+        FileReadError: If the index cannot be read, is corrupt or has an unsupported format.
+    """
+    try:
+        data = index_path.read_bytes()
+    except OSError as e:
+        logger.error(f"Error reading git index {index_path}: {e}")
+        raise FileReadError(f"Error reading git index {index_path}: {e}")
+
+    _verify_checksum(data, index_path)
+    try:
+        return _parse_index(data, index_path)
+    except (struct.error, ValueError, IndexError) as e:
+        raise FileReadError(f"Corrupt git index {index_path}: {e}")
+
+
+def _verify_checksum(data: bytes, index_path: Path) -> None:
+    """Check the SHA-1 trailer of the index, which also detects truncated files."""
+    if len(data) < _HEADER.size + _SHA1_SIZE:
+        raise FileReadError(f"Corrupt git index {index_path}: too short")
+    trailer = data[-_SHA1_SIZE:]
+    if trailer == bytes(_SHA1_SIZE):
+        # Written with index.skipHash, there is no checksum to verify
+        return
+    if hashlib.sha1(data[:-_SHA1_SIZE]).digest() == trailer:
+        return
+    if len(data) >= _HEADER.size + _SHA256_SIZE and hashlib.sha256(data[:-_SHA256_SIZE]).digest() == data[-_SHA256_SIZE:]:
+        raise FileReadError(f"Unsupported git index {index_path}: repositories using SHA-256 are not supported")
+    raise FileReadError(f"Corrupt git index {index_path}: checksum mismatch")
+
+
+def _parse_index(data: bytes, index_path: Path) -> List[GitIndexEntry]:
+    signature, version, count = _HEADER.unpack_from(data, 0)
+    if signature != b"DIRC" or version not in (2, 3, 4):
+        raise FileReadError(f"Unsupported git index format in {index_path}: {signature!r} version {version}")
+
+    entries: List[GitIndexEntry] = []
+    seen: Set[str] = set()
+    offset = _HEADER.size
+    previous_path = b""
+    for _ in range(count):
+        entry_start = offset
+        fields = _ENTRY.unpack_from(data, offset)
+        mtime_seconds, mtime_nanoseconds, mode, size, flags = fields[2], fields[3], fields[6], fields[9], fields[11]
+        offset += _ENTRY.size
+        extended_flags = 0
+        if version >= 3 and flags & _FLAG_EXTENDED:
+            (extended_flags,) = struct.unpack_from(">H", data, offset)
+            offset += 2
+
+        if version == 4:
+            # The path is stored as the number of bytes to remove from the previous path,
+            # followed by the NUL terminated suffix, without padding
+            strip, offset = _read_offset(data, offset)
+            end = data.index(b"\0", offset)
+            raw_path = previous_path[:len(previous_path) - strip] + data[offset:end]
+            offset = end + 1
+        else:
+            name_length = flags & _FLAG_NAME_MASK
+            if name_length == _FLAG_NAME_MASK:
+                end = data.index(b"\0", offset)
+            else:
+                end = offset + name_length
+            raw_path = data[offset:end]
+            # Entries are padded with 1-8 NUL bytes to a multiple of 8 bytes
+            offset = entry_start + ((end - entry_start) // 8 + 1) * 8
+        previous_path = raw_path
+
+        if extended_flags & _EXTENDED_FLAG_SKIP_WORKTREE:
+            continue
+        if mode & _MODE_TYPE_MASK not in (_MODE_REGULAR, _MODE_SYMLINK):
+            continue
+        path = raw_path.decode("utf-8", errors="surrogateescape")
+        if flags & _FLAG_STAGE_MASK and path in seen:
+            continue
+        seen.add(path)
+        entries.append(
+            GitIndexEntry(
+                path=path,
+                mode=mode,
+                size=size,
+                mtime=mtime_seconds + mtime_nanoseconds / 1e9,
+            )
+        )
+    _check_extensions(data, offset, index_path)
+    return entries
+
+
+def _check_extensions(data: bytes, offset: int, index_path: Path) -> None:
+    """Reject indexes whose entries are not all stored in the file itself."""
+    end = len(data) - _SHA1_SIZE
+    while offset + _EXTENSION_HEADER.size <= end:
+        signature, size = _EXTENSION_HEADER.unpack_from(data, offset)
+        if signature == _EXTENSION_SPLIT_INDEX:
+            # The entries of a split index are spread over this file and a shared index
+            raise FileReadError(f"Unsupported git index {index_path}: split indexes are not supported")
+        offset += _EXTENSION_HEADER.size + size
+
+
+def _read_offset(data: bytes, offset: int) -> Tuple[int, int]:
+    """Decode the variable length integer used by index version 4."""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        value += 1
+        byte = data[offset]
+        offset += 1
+        value = (value << 7) + (byte & 0x7F)
+    return value, offset
+
+
+class GitIndexScanner:
+    """Builds a `DirectorySnapshot` from the git index instead of walking the working tree.
+
+    Only tracked files are listed. Directories are derived from the file paths, ignored
+    directories are pruned and nested ignore files are registered with the file filter,
+    just like `DirectoryScanner` does.
+    """
+
+    def __init__(self, directory: Path, file_filter: Optional[FileFilter] = None):
+        """
+        Initialize the GitIndexScanner.
+
+        Args:
+            directory (Path): The directory to list, anywhere inside a git checkout. Relative
+                paths are made absolute, use the root of the returned snapshot as base directory.
+            file_filter (FileFilter, optional): The file filter used to prune ignored directories.
+
+        Raises:
+            FileReadError: If the directory is not inside a git checkout.
+        """
+        repository = discover_git_repository(directory)
+        if repository is None:
+            raise FileReadError(f"No git repository found for {directory}")
+        self.directory = directory.absolute()
+        self.file_filter = file_filter
+        self.work_tree, self.git_dir = repository
+
+    def scan(self) -> DirectorySnapshot:
+        """List the tracked files below the directory.
+
+        Returns:
+            DirectorySnapshot: The snapshot of the tracked files.
+        """
+        prefix = self.directory.resolve().relative_to(self.work_tree).as_posix()
+        prefix = "" if prefix == "." else prefix + "/"
+
+        files: Dict[str, List[ScannedEntry]] = {}
+        subdirectories: Dict[str, Set[str]] = {}
+        for index_entry in read_git_index(self.git_dir / "index"):
+            if not index_entry.path.startswith(prefix):
+                continue
+            relative = index_entry.path[len(prefix):]
+            parent, _, name = relative.rpartition("/")
+            path = self.directory.joinpath(*relative.split("/"))
+            try:
+                file_stat = os.lstat(path)
+            except OSError:
+                # Deleted from the working tree but not from the index
+                logger.debug(f"Skipping tracked file missing from the working tree: {path}")
+                continue
+            if stat.S_ISDIR(file_stat.st_mode) or (stat.S_ISLNK(file_stat.st_mode) and os.path.isdir(path)):
+                # Replaced by a directory, or a symbolic link to a directory
+                continue
+            files.setdefault(parent, []).append(
+                ScannedEntry(
+                    path=path,
+                    name=name,
+                    is_dir=False,
+                    is_file=True,
+                    is_symlink=stat.S_ISLNK(file_stat.st_mode),
+                    size=file_stat.st_size,
+                    mtime=file_stat.st_mtime,
+                )
+            )
+            # Record every directory on the way to the file
+            while parent:
+                grandparent, _, directory_name = parent.rpartition("/")
+                children = subdirectories.setdefault(grandparent, set())
+                if directory_name in children:
+                    break
+                children.add(directory_name)
+                parent = grandparent
+
+        if self.file_filter is not None:
+            self._register_parent_directories(prefix)
+
+        children: Dict[Path, List[ScannedEntry]] = {}
+        pending: List[str] = [""]
+        while pending:
+            current = pending.pop()
+            current_path = self.directory.joinpath(*current.split("/")) if current else self.directory
+            entries = list(files.get(current, []))
+            for name in subdirectories.get(current, ()):
+                entries.append(
+                    ScannedEntry(
+                        path=current_path / name,
+                        name=name,
+                        is_dir=True,
+                        is_file=False,
+                        is_symlink=False,
+                        size=0,
+                        mtime=0.0,
+                    )
+                )
+            entries.sort(key=lambda entry: (not entry.is_dir, entry.name.lower()))
+            children[current_path] = entries
+            if self.file_filter is not None:
+                ignore_files = [entry.name for entry in entries if entry.is_file and entry.name in self.file_filter.ignore_file_names]
+                self.file_filter.register_directory(current_path, ignore_files)
+            for entry in entries:
+                if not entry.is_dir:
+                    continue
+                if self.file_filter is not None and self.file_filter.should_prune_directory(entry.path):
+                    continue
+                pending.append(f"{current}/{entry.name}" if current else entry.name)
+        return DirectorySnapshot(self.directory, children, {})
+
+    def _register_parent_directories(self, prefix: str) -> None:
+        """Register the directories between the work tree and the scanned directory.
+
+        Ignore files in those directories also apply to the scanned directory, as with git.
+        """
+        depth = len([part for part in prefix.split("/") if part])
+        for parent in reversed(self.directory.parents[:depth]):
+            ignore_files = [name for name in self.file_filter.ignore_file_names if (parent / name).is_file()]
+            self.file_filter.register_directory(parent, ignore_files)
@@ -0,0 +1,133 @@
+"""Compiled Pattern Matching.
+
+This module provides a matcher for the gitwildmatch patterns of a `pathspec.PathSpec`
+that avoids trying every pattern for every path. `PathSpec` runs the regular expression of
+each pattern in turn, while the matcher indexes patterns by a literal path component or
+file extension they require, and only runs the patterns that can possibly match.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import pathspec
+
+_WILDCARDS = frozenset("*?[")
+
+_SEPARATORS = [sep for sep in (os.sep, os.altsep) if sep and sep != "/"]
+
+_IndexKey = Tuple[str, str]
+
+
+def _index_key(pattern: str) -> Optional[_IndexKey]:
+    """Return a literal that every path matched by the pattern must contain.
+
+    The key is either ("component", name) when the pattern has a path segment without
+    wildcards, which must then be a segment of the matched path, or ("extension", ext) when
+    a segment is a "*" followed by a literal containing a dot, so the matched segment must
+    have that extension. None is returned when no such literal can be derived safely.
+    """
+    if "\\" in pattern or pattern != pattern.strip():
+        return None
+    if pattern.startswith("!"):
+        pattern = pattern[1:]
+    extension_key: Optional[_IndexKey] = None
+    for segment in pattern.strip("/").split("/"):
+        if segment in ("", ".", "..", "**"):
+            continue
+        if not _WILDCARDS.intersection(segment):
+            return ("component", segment)
+        suffix = segment[1:]
+        if extension_key is None and segment.startswith("*") and "." in suffix and not _WILDCARDS.intersection(suffix):
+            extension_key = ("extension", suffix.rsplit(".", 1)[1])
+    return extension_key
+
+
+class CompiledMatcher:
+    """Matches paths against gitwildmatch patterns using an index of literal path parts.
+
+    The last matching pattern decides whether a path is included, exactly like
+    `pathspec.PathSpec.match_file`. Patterns are indexed by a path component or extension
+    they require, so matching a path only runs the patterns indexed under its components
+    and extensions, plus the few patterns that cannot be indexed (such as "name*"). The
+    candidates are tried from the last pattern to the first and the first match decides.
+    """
+
+    def __init__(self, patterns: Iterable[pathspec.RegexPattern]):
+        """
+        Initialize the CompiledMatcher.
+
+        Args:
+            patterns (Iterable[pathspec.RegexPattern]): Regex based patterns, such as the
+                patterns of a `pathspec.PathSpec` using the "gitwildmatch" style.
+        """
+        self._patterns: List[Tuple[bool, "re.Pattern[str]"]] = []
+        self._by_component: Dict[str, List[int]] = {}
+        self._by_extension: Dict[str, List[int]] = {}
+        self._unindexed: List[int] = []
+        for pattern in patterns:
+            if pattern.include is None:
+                # Comments and blank lines never match
+                continue
+            index = len(self._patterns)
+            self._patterns.append((pattern.include, pattern.regex))
+            key = _index_key(pattern.pattern) if isinstance(pattern.pattern, str) else None
+            if key is None:
+                self._unindexed.append(index)
+            elif key[0] == "component":
+                self._by_component.setdefault(key[1], []).append(index)
+            else:
+                self._by_extension.setdefault(key[1], []).append(index)
+
+    @classmethod
+    def from_spec(cls, spec: pathspec.PathSpec) -> "CompiledMatcher":
+        """Create a matcher from the patterns of a `pathspec.PathSpec`."""
+        return cls(spec.patterns)
+
+    @property
+    def unindexed_count(self) -> int:
+        """Return the number of patterns that are tried for every path."""
+        return len(self._unindexed)
+
+    def match_file(self, file: str) -> bool:
+        """Check whether the path matches the patterns.
+
+        Args:
+            file (str): The path to check, with a trailing "/" for directories.
+
+        Returns:
+            bool: True if the last matching pattern is an include pattern.
+        """
+        return bool(self.check_file(file))
+
+    def check_file(self, file: str) -> Optional[bool]:
+        """Return the include flag of the last pattern matching the path.
+
+        Args:
+            file (str): The path to check, with a trailing "/" for directories.
+
+        Returns:
+            Optional[bool]: True for an include pattern, False for a negated pattern, and
+                None if no pattern matches.
+        """
+        for sep in _SEPARATORS:
+            file = file.replace(sep, "/")
+        if file.startswith("/"):
+            file = file[1:]
+        elif file.startswith("./"):
+            file = file[2:]
+
+        candidates = set(self._unindexed)
+        for segment in file.rstrip("/").split("/"):
+            indices = self._by_component.get(segment)
+            if indices:
+                candidates.update(indices)
+            if "." in segment:
+                indices = self._by_extension.get(segment.rsplit(".", 1)[1])
+                if indices:
+                    candidates.update(indices)
+
+        for index in sorted(candidates, reverse=True):
+            include, regex = self._patterns[index]
+            if regex.match(file) is not None:
+                return include
+        return None
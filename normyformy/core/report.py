@@ -5,7 +5,7 @@ into a comprehensive report.
 
 NOTE: This module is a modified version of Copcon module: copcon/core/report.py
 """
-from typing import Dict
+from typing import Callable, Iterable, Iterator, Mapping, Optional, TextIO, Tuple, Union
 import logging
 from pathlib import Path
 
@@ -14,19 +14,30 @@ logger = logging.getLogger(__name__)
 class ReportFormatter:
     """Formats the directory structure and file contents into a structured report."""
 
-    def __init__(self, project_name: str, directory_tree: str, file_contents: Dict[Path, str]):
+    def __init__(
+        self,
+        project_name: str,
+        directory_tree: str,
+        file_contents: Union[Mapping[Path, str], Iterable[Tuple[Path, str]]],
+        footer: Optional[Callable[[], str]] = None,
+    ):
         """
         Initialize the ReportFormatter.
 
         Args:
             project_name (str): The name of the project.
             directory_tree (str): The directory tree representation.
-            file_contents (Dict[str, str]): A mapping of file paths to their contents.
+            file_contents (Union[Mapping[Path, str], Iterable[Tuple[Path, str]]]): A mapping of
+                file paths to their contents, or an iterable of (path, content) pairs. An
+                iterable is consumed lazily by `iter_chunks` and can only be formatted once.
+            footer (Callable[[], str], optional): Returns a note added after the file contents,
+                called once they are consumed so it can summarize lazily read files.
         """
 
         self.project_name = project_name
         self.directory_tree = directory_tree
         self.file_contents = file_contents
+        self.footer = footer
 
     def format(self) -> str:
         """Format the report as a string.
@@ -35,20 +46,66 @@ class ReportFormatter:
             str: The formatted report.
         """
 
-        report = [
+        return "".join(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Yield the report in chunks, one for the header, one per file and one for the footer.
+
+        Joining the chunks gives the same text as `format`, but only one file content is
+        held at a time when the file contents are produced lazily.
+
+        Yields:
+            str: The next chunk of the report.
+        """
+
+        yield "\n".join([
             "Directory Structure:",
             self.project_name,
             self.directory_tree,
             "\nFile Contents:"
-        ]
-        for relative_path, content in self.file_contents.items():
-            report.extend([
+        ])
+        file_contents = self.file_contents
+        if isinstance(file_contents, Mapping):
+            file_contents = file_contents.items()
+        for relative_path, content in file_contents:
+            yield "\n".join([
+                "",
                 f"\nFile: {relative_path}",
                 "-" * 40,
                 content,
                 "-" * 40
             ])
-        return "\n".join(report)
+        footer = self.footer() if self.footer is not None else ""
+        if footer:
+            yield f"\n\n{footer}"
+
+    def write_stream(self, stream: TextIO) -> None:
+        """Write the report chunk by chunk to an open text stream.
+
+        Args:
+            stream (TextIO): The stream to write to.
+        """
+
+        for chunk in self.iter_chunks():
+            stream.write(chunk)
+
+    def stream_to_file(self, output_file: Path):
+        """Write the report to a file without building the whole report in memory.
+
+        Args:
+            output_file (Path): The path to the output file.
+
+        Raises:
+            Exception: If there is an error writing to the file.
+        """
+
+        try:
+            with output_file.open('w', encoding='utf-8') as f:
+                self.write_stream(f)
+            logger.info(f"Output written to {output_file}")
+        except Exception as e:
+            logger.error(f"Error writing to file {output_file}: {e}")
+            raise
 
     def write_to_file(self, report: str, output_file: Path):
         """Write the formatted report to a file.
@@ -0,0 +1,210 @@
+"""Directory Scanning.
+
+This module provides a single-pass directory scanner built on `os.scandir`. The scanner
+produces an in-memory snapshot of the directory tree (entries, entry types, sizes and
+modification times) that is shared by the tree generator and the file content reader,
+so the file system is only walked once per report.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+from core.file_filter import FileFilter
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ScannedEntry:
+    """A single directory entry captured by the scanner."""
+
+    path: Path
+    name: str
+    is_dir: bool
+    is_file: bool
+    is_symlink: bool
+    size: int
+    """Size in bytes, 0 for directories."""
+
+    mtime: float
+    """Modification time as a POSIX timestamp."""
+
+
+class DirectorySnapshot:
+    """An in-memory snapshot of a directory tree produced by `DirectoryScanner`.
+
+    Children of every scanned directory are stored sorted with directories first and then
+    by lower-cased name, which is the order used when rendering the directory tree.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        children: Dict[Path, List[ScannedEntry]],
+        errors: Dict[Path, OSError],
+    ):
+        """
+        Initialize the DirectorySnapshot.
+
+        Args:
+            root (Path): The root directory of the snapshot.
+            children (Dict[Path, List[ScannedEntry]]): Sorted entries of every scanned directory.
+            errors (Dict[Path, OSError]): Errors raised while listing directories.
+        """
+        self.root = root
+        self._children = children
+        self._errors = errors
+
+    def children(self, directory: Path) -> List[ScannedEntry]:
+        """Return the entries of a scanned directory.
+
+        Args:
+            directory (Path): The directory to list.
+
+        Returns:
+            List[ScannedEntry]: The sorted entries, empty if the directory was not scanned.
+
+        Raises:
+            OSError: If listing the directory failed during the scan.
+        """
+        if directory in self._errors:
+            raise self._errors[directory]
+        return self._children.get(directory, [])
+
+    def iter_files(self, directory: Optional[Path] = None) -> Iterator[ScannedEntry]:
+        """Yield all files in the snapshot, depth first with files before subdirectories.
+
+        Args:
+            directory (Path, optional): The directory to start from, defaults to the root.
+
+        Yields:
+            ScannedEntry: Every regular file below the directory.
+        """
+        pending: List[Path] = [self.root if directory is None else directory]
+        while pending:
+            current = pending.pop()
+            if current in self._errors:
+                logger.warning(f"Skipping directory {current}: {self._errors[current]}")
+                continue
+            entries = self._children.get(current, [])
+            for entry in entries:
+                if entry.is_file:
+                    yield entry
+            # Reverse so the first subdirectory is visited first. Symbolic links to
+            # directories are only expanded in the tree, their files are not listed.
+            pending.extend(entry.path for entry in reversed(entries) if entry.is_dir and not entry.is_symlink)
+
+    def is_scanned(self, directory: Path) -> bool:
+        """Return whether the entries of the directory were listed by the scan."""
+        return directory in self._children or directory in self._errors
+
+    @property
+    def file_count(self) -> int:
+        """Return the number of files in the snapshot."""
+        return sum(1 for _ in self.iter_files())
+
+
+class DirectoryScanner:
+    """Scans a directory tree once using `os.scandir`.
+
+    The entry type comes from the directory listing itself, so only a single `stat` per
+    entry is issued to capture its size and modification time. Symbolic links to
+    directories are descended into for the directory tree, unless they point to a directory
+    that is already being scanned above them, which would be a cycle. When a file filter is given, ignored
+    directories are recorded but their contents are never listed, and every scanned
+    directory is registered with the filter together with the ignore files it contains.
+    """
+
+    def __init__(self, directory: Path, file_filter: Optional[FileFilter] = None):
+        """
+        Initialize the DirectoryScanner.
+
+        Args:
+            directory (Path): The root directory to scan.
+            file_filter (FileFilter, optional): The file filter used to prune ignored directories.
+
+        Attributes:
+            stat_count (int): The number of `stat` calls issued by the last scan.
+            pruned_count (int): The number of directories pruned by the last scan.
+        """
+        self.directory = directory
+        self.file_filter = file_filter
+        self.stat_count = 0
+        self.pruned_count = 0
+
+    def scan(self) -> DirectorySnapshot:
+        """Scan the directory tree.
+
+        Returns:
+            DirectorySnapshot: The snapshot of the scanned tree.
+        """
+        self.stat_count = 0
+        self.pruned_count = 0
+        children: Dict[Path, List[ScannedEntry]] = {}
+        errors: Dict[Path, OSError] = {}
+        # Every pending directory is paired with the resolved paths of itself and its
+        # parents, used to detect symbolic links pointing back up the tree
+        root = os.path.realpath(self.directory)
+        pending: List[Tuple[Path, FrozenSet[str], str]] = [(self.directory, frozenset({root}), root)]
+        while pending:
+            current, ancestors, real_path = pending.pop()
+            try:
+                entries = self._scan_directory(current)
+            except OSError as e:
+                logger.debug(f"Error scanning directory {current}: {e}")
+                errors[current] = e
+                continue
+            children[current] = entries
+            if self.file_filter is not None:
+                ignore_files = [
+                    entry.name for entry in entries
+                    if entry.is_file and entry.name in self.file_filter.ignore_file_names
+                ]
+                self.file_filter.register_directory(current, ignore_files)
+            for entry in entries:
+                if not entry.is_dir:
+                    continue
+                if self.file_filter is not None and self.file_filter.should_prune_directory(entry.path):
+                    self.pruned_count += 1
+                    continue
+                if entry.is_symlink:
+                    target = os.path.realpath(entry.path)
+                    if target in ancestors:
+                        logger.debug(f"Not following symbolic link {entry.path}, it points to a parent directory")
+                        continue
+                else:
+                    target = os.path.join(real_path, entry.name)
+                pending.append((entry.path, ancestors | {target}, target))
+        return DirectorySnapshot(self.directory, children, errors)
+
+    def _scan_directory(self, directory: Path) -> List[ScannedEntry]:
+        entries: List[ScannedEntry] = []
+        with os.scandir(directory) as it:
+            for dir_entry in it:
+                entries.append(self._to_entry(directory, dir_entry))
+        entries.sort(key=lambda entry: (not entry.is_dir, entry.name.lower()))
+        return entries
+
+    def _to_entry(self, directory: Path, dir_entry: os.DirEntry) -> ScannedEntry:
+        is_symlink = dir_entry.is_symlink()
+        try:
+            is_dir = dir_entry.is_dir()
+            is_file = not is_dir and dir_entry.is_file()
+            stat = dir_entry.stat()
+            self.stat_count += 1
+            size = 0 if is_dir else stat.st_size
+            mtime = stat.st_mtime
+        except OSError:
+            # Broken symbolic links and entries removed while scanning
+            is_dir, is_file, size, mtime = False, False, 0, 0.0
+        return ScannedEntry(
+            path=directory / dir_entry.name,
+            name=dir_entry.name,
+            is_dir=is_dir,
+            is_file=is_file,
+            is_symlink=is_symlink,
+            size=size,
+            mtime=mtime,
+        )
@@ -1,41 +1,161 @@
 """Generate a report from the codebase."""
+import logging
 import pathlib
-from normyformy.core.file_filter import FileFilter
+from typing import Any, Literal
+from normyformy.core.autodiscover import discover_copconignore
+from normyformy.core.file_filter import FileFilter, GITIGNORE_FILE_NAME, IGNORE_FILE_NAME
+from normyformy.core.git_index import GitIndexScanner, discover_git_repository
 from normyformy.core.file_tree import FileTreeGenerator
 from normyformy.core.file_reader import FileContentReader
+from normyformy.core.scanner import DirectoryScanner
 from normyformy.core.report import ReportFormatter
-from normyformy.python_module_compressor import compress_python_module
+from normyformy.budgeted_report import BudgetedReportBuilder, estimate_tokens
+from normyformy.compression_stage import CompressionOptions, CompressionStage
+from exceptions import FileReadError
 
+logger = logging.getLogger(__name__)
 
-def generate_file_report(directory: pathlib.Path, depth: int, exclude_hidden: bool) -> str:
-    print("Generating file report...")
-    # Build a FileFilter with target support
-    file_filter = FileFilter(
-        user_ignore_path=pathlib.Path(".copconignore"),
-        user_target_path=None
+DEFAULT_MAX_FILE_BYTES: int = 512 * 1024
+"""Files larger than this are reduced to a head and tail snippet in the report."""
+
+
+def generate_file_report(
+    directory: pathlib.Path,
+    depth: int,
+    exclude_hidden: bool,
+    read_workers: int | None = None,
+    max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+    max_total_bytes: int | None = None,
+    enumeration: Literal["filesystem", "git"] = "filesystem",
+    token_budget: int | None = None,
+    compression: CompressionOptions | None = None,
+) -> str:
+    logger.info("Generating file report...")
+    formatter = _create_formatter(
+        directory,
+        depth,
+        exclude_hidden,
+        read_workers=read_workers,
+        max_file_bytes=max_file_bytes,
+        max_total_bytes=max_total_bytes,
+        enumeration=enumeration,
+        token_budget=token_budget,
+        compression=compression,
+    )
+    return formatter.format()
+
+
+def create_report_formatter(
+    directory: pathlib.Path,
+    depth: int,
+    exclude_hidden: bool,
+    **options: Any,
+) -> ReportFormatter:
+    """Create the formatter of the report, for callers that use the tree and file contents separately.
+
+    Accepts the same keyword options as `generate_file_report`. The file contents of the
+    formatter may be an iterator that can only be consumed once.
+    """
+    return _create_formatter(directory, depth, exclude_hidden, **options)
+
+
+def write_file_report(
+    directory: pathlib.Path,
+    output_file: pathlib.Path,
+    depth: int,
+    exclude_hidden: bool,
+    **options: Any,
+) -> None:
+    """Stream the report for the directory into a file.
+
+    Files are read while the report is written, so only one file content is held in memory
+    at a time. Accepts the same keyword options as `generate_file_report`.
+    """
+    logger.info("Writing file report...")
+    formatter = _create_formatter(directory, depth, exclude_hidden, **options)
+    formatter.stream_to_file(output_file)
+
+
+def _create_file_filter(directory: pathlib.Path, enumeration: Literal["filesystem", "git"]) -> FileFilter:
+    """Build a FileFilter with target support.
+
+    Nested .copconignore files below the directory are picked up while scanning, the closest
+    one at or above it is the user ignore file. When listing from the git index, .gitignore
+    files are honored as well.
+    """
+    ignore_file_names = (GITIGNORE_FILE_NAME, IGNORE_FILE_NAME) if enumeration == "git" else (IGNORE_FILE_NAME,)
+    return FileFilter(
+        user_ignore_path=discover_copconignore(directory) or pathlib.Path(".copconignore"),
+        user_target_path=None,
+        ignore_file_names=ignore_file_names,
     )
 
+
+def _create_formatter(
+    directory: pathlib.Path,
+    depth: int,
+    exclude_hidden: bool,
+    read_workers: int | None = None,
+    max_file_bytes: int | None = DEFAULT_MAX_FILE_BYTES,
+    max_total_bytes: int | None = None,
+    enumeration: Literal["filesystem", "git"] = "filesystem",
+    token_budget: int | None = None,
+    compression: CompressionOptions | None = None,
+) -> ReportFormatter:
+    """Scan the directory and create a formatter that reads file contents lazily."""
+    if enumeration == "git" and discover_git_repository(directory) is None:
+        logger.info(f"No git repository found for {directory}, scanning the file system instead.")
+        enumeration = "filesystem"
+
+    file_filter = _create_file_filter(directory, enumeration)
+
+    # Scan the directory once, the snapshot is shared by the tree generator and the reader.
+    # Ignored directories are pruned, so their contents are never listed.
+    snapshot = None
+    if enumeration == "git":
+        # Tracked files are listed from the git index without walking the working tree
+        try:
+            snapshot = GitIndexScanner(directory, file_filter).scan()
+            directory = snapshot.root
+        except FileReadError as e:
+            logger.warning(f"Could not use the git index for {directory}, scanning the file system instead: {e}")
+            file_filter = _create_file_filter(directory, "filesystem")
+    if snapshot is None:
+        snapshot = DirectoryScanner(directory, file_filter).scan()
+
     # Generate directory tree
-    tree_generator = FileTreeGenerator(directory, depth, file_filter)
+    tree_generator = FileTreeGenerator(directory, depth, file_filter, snapshot)
     directory_tree = tree_generator.generate()
 
     # Read file contents
-    reader = FileContentReader(directory, file_filter, exclude_hidden)
-    file_contents = reader.read_all()
+    reader = FileContentReader(
+        directory,
+        file_filter,
+        exclude_hidden,
+        snapshot,
+        max_workers=read_workers,
+        max_file_bytes=max_file_bytes,
+        max_total_bytes=max_total_bytes,
+    )
+    file_contents = reader.iter_contents()
 
+    if compression is not None:
+        logger.info("Compressing file contents...")
+        stage = CompressionStage(compression)
+        file_contents = stage.run(dict(file_contents))
 
-    # # Compress all files
-    # print("Compressing file contents...")
-    # compressed_contents = {
-    #     file_path: compress_python_module(content, keep_docstrings=False, keep_imports=False, include_line_count=True)
-    #     for file_path, content in file_contents.items() if file_path.endswith('.py')
-    # }
+    if token_budget is not None:
+        # Keep the most important files, compressed if needed, within the token budget
+        header = ReportFormatter(directory.name, directory_tree, {}).format()
+        if compression is not None:
+            # Python files are already compressed by the compression stage
+            builder = BudgetedReportBuilder(token_budget, levels=())
+        else:
+            builder = BudgetedReportBuilder(token_budget)
+        file_contents = builder.build(dict(file_contents), reserved_tokens=estimate_tokens(header))
 
     # Format the textual report from file structure and contents
-    formatter = ReportFormatter(directory.name, directory_tree, file_contents)
-    report = formatter.format()
-
-    return report
+    return ReportFormatter(directory.name, directory_tree, file_contents, footer=reader.omitted_summary)
 
 
 
@@ -0,0 +1,245 @@
+"""Import graph built from file contents already in memory.
+
+`grimp` finds the modules of an importable package on `sys.path` and parses them again,
+while the report has already read every file. `build_import_graph_from_contents` builds
+the graph of direct imports between the files of `file_contents` instead. Imports are
+found with a line scan that skips triple quoted strings, and only the import statements
+themselves are parsed with `ast`. Large inputs are scanned in a process pool.
+
+Only imports between the scanned modules are recorded, like grimp without external
+packages. With `resolve_suffixes`, dotted absolute imports that do not match a module name
+exactly are also matched by their suffix, so packages imported relative to a `sys.path`
+entry below the scanned directory (such as `from core.x import y` for `src/core/x.py`)
+are resolved. This is opt-in, since an import of another package can match a module of
+the same name by accident (`from test.support import x` inside `unittest` is not
+`unittest.test.support`). Single names are never matched by suffix.
+"""
+
+from __future__ import annotations
+
+import ast
+import logging
+import os
+import pathlib
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Protocol, Set, Tuple
+
+from normyformy.python_module_compressor import path_to_module_str
+
+logger = logging.getLogger(__name__)
+
+_IMPORT_START = re.compile(r"^[ \t]*(?:from[ \t]+[.\w]|import[ \t]+\w)", re.MULTILINE)
+_TRIPLE_QUOTE = re.compile(r"'''|\"\"\"")
+
+_ImportedName = Tuple[int, Optional[str], Tuple[str, ...]]
+"""Relative import level, module and imported names, e.g. (1, "x", ("y",)) for `from .x import y`."""
+
+SEQUENTIAL_SCAN_LIMIT: int = 200
+"""Inputs with up to this many modules are scanned in process."""
+
+
+class SupportsDirectImports(Protocol):
+    """The part of `grimp.ImportGraph` used by `FileCompressor`."""
+
+    def find_modules_directly_imported_by(self, module: str) -> Set[str]: ...
+
+    def find_modules_that_directly_import(self, module: str) -> Set[str]: ...
+
+
+class ImportGraph:
+    """Directed graph of direct imports between modules, with the query methods of grimp."""
+
+    def __init__(self) -> None:
+        self._imports: Dict[str, Set[str]] = {}
+        self._imported_by: Dict[str, Set[str]] = {}
+
+    @property
+    def modules(self) -> Set[str]:
+        return set(self._imports)
+
+    def add_module(self, module: str) -> None:
+        self._imports.setdefault(module, set())
+        self._imported_by.setdefault(module, set())
+
+    def add_import(self, importer: str, imported: str) -> None:
+        self.add_module(importer)
+        self.add_module(imported)
+        self._imports[importer].add(imported)
+        self._imported_by[imported].add(importer)
+
+    def find_modules_directly_imported_by(self, module: str) -> Set[str]:
+        return set(self._imports.get(module, ()))
+
+    def find_modules_that_directly_import(self, module: str) -> Set[str]:
+        return set(self._imported_by.get(module, ()))
+
+    def direct_import_exists(self, importer: str, imported: str) -> bool:
+        return imported in self._imports.get(importer, ())
+
+
+def _string_spans(source: str) -> List[Tuple[int, int]]:
+    """Return the spans of triple quoted strings, such as docstrings."""
+    spans: List[Tuple[int, int]] = []
+    position = 0
+    while True:
+        match = _TRIPLE_QUOTE.search(source, position)
+        if match is None:
+            return spans
+        end = source.find(match.group(), match.end())
+        if end == -1:
+            spans.append((match.start(), len(source)))
+            return spans
+        spans.append((match.start(), end + 3))
+        position = end + 3
+
+
+def _statement_end(source: str, start: int) -> int:
+    """Return the end of the logical line starting at `start`, following parentheses and backslashes."""
+    depth = 0
+    position = start
+    length = len(source)
+    while position < length:
+        char = source[position]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "\\" and source.startswith("\\\n", position):
+            position += 2
+            continue
+        elif char in "\n;#" and depth <= 0:
+            return position
+        position += 1
+    return position
+
+
+def scan_imports(source: str) -> List[_ImportedName]:
+    """Return the import statements of a module, anywhere in the module."""
+    spans = _string_spans(source)
+    span_index = 0
+    imports: List[_ImportedName] = []
+    for match in _IMPORT_START.finditer(source):
+        start = match.start()
+        while span_index < len(spans) and spans[span_index][1] <= start:
+            span_index += 1
+        if span_index < len(spans) and spans[span_index][0] <= start:
+            continue
+        statement = source[start:_statement_end(source, start)].strip()
+        try:
+            node = ast.parse(statement).body[0]
+        except (SyntaxError, ValueError, IndexError):
+            continue
+        if isinstance(node, ast.Import):
+            imports.extend((0, alias.name, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.level, node.module, tuple(alias.name for alias in node.names)))
+    return imports
+
+
+def _scan_batch(sources: List[str]) -> List[List[_ImportedName]]:
+    return [scan_imports(source) for source in sources]
+
+
+class _Resolver:
+    """Resolve imported names to the known modules."""
+
+    def __init__(self, modules: Iterable[str], resolve_suffixes: bool = False) -> None:
+        self.modules: Set[str] = set(modules)
+        self._by_suffix: Dict[str, Optional[str]] = {}
+        if not resolve_suffixes:
+            return
+        for module in self.modules:
+            parts = module.split(".")
+            for i in range(1, len(parts) - 1):
+                suffix = ".".join(parts[i:])
+                # Only dotted suffixes are recorded, and ambiguous suffixes are not resolved
+                self._by_suffix[suffix] = None if suffix in self._by_suffix else module
+
+    def resolve(self, name: str) -> Optional[str]:
+        if name in self.modules:
+            return name
+        return self._by_suffix.get(name)
+
+    def resolve_import(self, importer: str, is_package: bool, imported: _ImportedName) -> Set[str]:
+        level, module, names = imported
+        if level:
+            package_parts = importer.split(".") if is_package else importer.split(".")[:-1]
+            if level - 1 > len(package_parts):
+                return set()
+            base_parts = package_parts[:len(package_parts) - (level - 1)]
+            base = ".".join(base_parts + ([module] if module else []))
+            candidates = [f"{base}.{name}" if base else name for name in names]
+            resolved = {candidate for candidate in candidates if candidate in self.modules}
+            if base in self.modules and len(resolved) < len(names):
+                resolved.add(base)
+            return resolved
+        if module is None:
+            return set()
+        if not names:
+            # "import a.b.c" imports the deepest known module of the dotted name
+            parts = module.split(".")
+            for i in range(len(parts), 0, -1):
+                found = self.resolve(".".join(parts[:i]))
+                if found is not None:
+                    return {found}
+            return set()
+        resolved: Set[str] = set()
+        for name in names:
+            found = self.resolve(f"{module}.{name}")
+            if found is not None:
+                resolved.add(found)
+        if len(resolved) < len(names):
+            found = self.resolve(module)
+            if found is not None:
+                resolved.add(found)
+        return resolved
+
+
+def build_import_graph_from_contents(
+    file_contents: Dict[pathlib.Path, str],
+    base_module: pathlib.Path = pathlib.Path(),
+    max_workers: Optional[int] = None,
+    resolve_suffixes: bool = False,
+) -> ImportGraph:
+    """Build the graph of imports between the Python files of a report.
+
+    Args:
+        file_contents: Mapping of relative file paths to their contents.
+        base_module: Path prepended to the file paths to derive the module names, as used
+            by `FileCompressor`.
+        max_workers: Number of processes used to scan the files, defaults to the number of
+            CPUs. Use 1 to scan in process.
+        resolve_suffixes: Also resolve dotted imports that match the end of a module name,
+            for packages imported relative to a directory below `base_module`.
+
+    Returns:
+        The import graph, with a module for every Python file.
+    """
+    start = time.perf_counter()
+    python_files = [(path, content) for path, content in file_contents.items() if path.suffix == ".py"]
+    module_names = [path_to_module_str(base_module / path) for path, _ in python_files]
+    sources = [content for _, content in python_files]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(sources) <= SEQUENTIAL_SCAN_LIMIT:
+        scanned = _scan_batch(sources)
+    else:
+        chunksize = max(1, len(sources) // (max_workers * 4))
+        batches = [sources[i:i + chunksize] for i in range(0, len(sources), chunksize)]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            scanned = [imports for batch in executor.map(_scan_batch, batches) for imports in batch]
+
+    graph = ImportGraph()
+    for module in module_names:
+        graph.add_module(module)
+    resolver = _Resolver(module_names, resolve_suffixes)
+    for (path, _), importer, imports in zip(python_files, module_names, scanned):
+        is_package = path.name == "__init__.py"
+        for imported in imports:
+            for module in resolver.resolve_import(importer, is_package, imported):
+                if module != importer:
+                    graph.add_import(importer, module)
+    logger.info(f"Built import graph of {len(module_names)} modules in {time.perf_counter() - start:.2f}s")
+    return graph
@@ -0,0 +1,153 @@
+"""Persistent cache for the grimp import graph.
+
+`grimp.build_graph` can cache the imports of each module between runs, but it only reuses
+an entry when the modification time of the module is unchanged. A fresh checkout, as in
+most CI runs, gives every file a new modification time, so the whole package is scanned
+again. `ContentHashCache` extends the grimp cache to also reuse an entry when the SHA-256
+of the module content is unchanged, and `build_import_graph` builds the graph with it, so
+only modules that actually changed are parsed.
+
+The cache extends grimp internals, so grimp is pinned to major version 3. It is used by
+`FileCompressor` when a package name is given instead of building the graph from the
+file contents (see `normyformy.import_graph`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import time
+from typing import Dict, Optional, Set
+
+import grimp
+from grimp.adaptors.caching import Cache
+from grimp.application.config import settings
+from grimp.application.ports.caching import CacheMiss
+from grimp.application.ports.modulefinder import FoundPackage, ModuleFile
+from grimp.domain.valueobjects import DirectImport, Module
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIRECTORY: pathlib.Path = pathlib.Path(".normyformy_cache") / "import_graph"
+
+
+class ContentHashCache(Cache):
+    """Grimp cache that also accepts entries of modules whose content hash is unchanged."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._hash_map: Dict[str, str] = {}
+        self._current_hashes: Dict[str, str] = {}
+        self.hash_hits = 0
+
+    @classmethod
+    def setup(cls, *args, **kwargs) -> "ContentHashCache":
+        cache = super().setup(*args, **kwargs)
+        cache._hash_map = cache._read_hash_map_files()
+        return cache
+
+    def read_imports(self, module_file: ModuleFile) -> Set[DirectImport]:
+        try:
+            return super().read_imports(module_file)
+        except CacheMiss:
+            pass
+        name = module_file.module.name
+        cached_hash = self._hash_map.get(name)
+        if cached_hash is None or module_file.module not in self._data_map:
+            raise CacheMiss
+        if self._content_hash(module_file.module) != cached_hash:
+            raise CacheMiss
+        self.hash_hits += 1
+        return self._data_map[module_file.module]
+
+    def write(self, imports_by_module: Dict[Module, Set[DirectImport]]) -> None:
+        if self.hash_hits:
+            logger.info(f"Reused the imports of {self.hash_hits} modules with unchanged content and a new modification time")
+        super().write(imports_by_module)
+        for found_package in self.found_packages:
+            hash_map: Dict[str, str] = {}
+            for module_file in found_package.module_files:
+                name = module_file.module.name
+                if name not in self._current_hashes and self._mtime_map.get(name) == module_file.mtime:
+                    # Unchanged since the hash was stored, no need to read the file again
+                    hash_map[name] = self._hash_map.get(name) or self._content_hash(module_file.module)
+                else:
+                    hash_map[name] = self._content_hash(module_file.module)
+            self.file_system.write(self._hash_map_file_name(found_package), json.dumps(hash_map))
+
+    def _content_hash(self, module: Module) -> str:
+        if module.name not in self._current_hashes:
+            content = self.file_system.read(self._module_path(module))
+            digest = hashlib.sha256(content.encode("utf-8", errors="surrogatepass")).hexdigest()
+            self._current_hashes[module.name] = digest
+        return self._current_hashes[module.name]
+
+    def _module_path(self, module: Module) -> str:
+        for found_package in self.found_packages:
+            if module.name == found_package.name or module.name.startswith(found_package.name + "."):
+                parts = module.name.split(".")[1:]
+                path = self.file_system.join(found_package.directory, *parts)
+                if self.file_system.exists(path + ".py"):
+                    return path + ".py"
+                return self.file_system.join(path, "__init__.py")
+        raise CacheMiss
+
+    def _hash_map_file_name(self, found_package: FoundPackage) -> str:
+        return self.file_system.join(self.cache_dir, f"{found_package.name}.hashes.json")
+
+    def _read_hash_map_files(self) -> Dict[str, str]:
+        hashes: Dict[str, str] = {}
+        for found_package in self.found_packages:
+            try:
+                hashes.update(json.loads(self.file_system.read(self._hash_map_file_name(found_package))))
+            except FileNotFoundError:
+                continue
+            except (json.JSONDecodeError, TypeError, ValueError):
+                logger.warning(f"Could not use corrupt hash cache file for {found_package.name}")
+        return hashes
+
+
+def build_import_graph(
+    package_name: str,
+    cache_directory: Optional[pathlib.Path] = DEFAULT_CACHE_DIRECTORY,
+    include_external_packages: bool = False,
+) -> grimp.ImportGraph:
+    """Build the import graph of a package, reusing the imports of unchanged modules.
+
+    Args:
+        package_name: The name of the top level package, which must be importable.
+        cache_directory: Directory of the persistent cache, None disables caching.
+        include_external_packages: Whether to include external packages in the graph.
+
+    Returns:
+        The import graph.
+    """
+    start: float = time.perf_counter()
+    if cache_directory is None:
+        graph = grimp.build_graph(package_name, include_external_packages=include_external_packages, cache_dir=None)
+    else:
+        os.makedirs(cache_directory, exist_ok=True)
+        try:
+            previous_cache_class = settings.CACHE_CLASS
+            settings.configure(CACHE_CLASS=ContentHashCache)
+        except AttributeError as e:
+            # The cache class is configured through grimp internals, which may change
+            logger.warning(f"Could not configure the content hash cache, using the grimp cache: {e}")
+            return grimp.build_graph(
+                package_name,
+                include_external_packages=include_external_packages,
+                cache_dir=str(cache_directory),
+            )
+        try:
+            graph = grimp.build_graph(
+                package_name,
+                include_external_packages=include_external_packages,
+                cache_dir=str(cache_directory),
+            )
+        finally:
+            settings.configure(CACHE_CLASS=previous_cache_class)
+    logger.info(f"Built import graph of {package_name} with {len(graph.modules)} modules in {time.perf_counter() - start:.2f}s")
+    return graph
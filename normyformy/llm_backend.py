@@ -0,0 +1,134 @@
+"""LLM backends evaluating a prompt into a structured response.
+
+The review pipeline only needs a structured response for a prompt and a JSON schema, which
+is described by the `LLMBackend` protocol. `AzureOpenAIBackend` calls an Azure OpenAI
+deployment through langchain. `FakeLLMBackend` answers locally with deterministic
+responses that follow the schema, after a simulated latency, so the pipeline can be
+tested and benchmarked without network access.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from typing import Any, Optional, Protocol
+
+from normyformy.budgeted_report import estimate_tokens
+
+
+class LLMBackend(Protocol):
+    """Evaluates prompts into responses following a JSON schema."""
+
+    @property
+    def name(self) -> str:
+        """Name of the model deployment, part of the response cache key."""
+        ...
+
+    def evaluate(self, prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]: ...
+
+    async def aevaluate(self, prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]: ...
+
+
+class AzureOpenAIBackend:
+    """Backend calling an Azure OpenAI chat deployment with structured output."""
+
+    def __init__(self, azure_endpoint: str, api_key: Optional[str], deployment: str, api_version: str) -> None:
+        # Imported here so the other backends do not need langchain
+        from langchain_openai import AzureChatOpenAI
+
+        self.deployment = deployment
+        self.llm: AzureChatOpenAI = AzureChatOpenAI(
+            azure_endpoint=azure_endpoint,
+            api_key=api_key,
+            azure_deployment=deployment,
+            api_version=api_version,
+        )
+
+    @property
+    def name(self) -> str:
+        return self.deployment
+
+    def evaluate(self, prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]:
+        return self.llm.with_structured_output(json_schema).invoke(prompt)
+
+    async def aevaluate(self, prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]:
+        return await self.llm.with_structured_output(json_schema).ainvoke(prompt)
+
+
+class FakeLLMBackend:
+    """Local backend returning deterministic responses that follow the schema.
+
+    Every property of the schema gets a value of its type derived from the hash of the
+    prompt and the property name, so the same prompt always gives the same response.
+    Integers and numbers respect the "minimum" and "maximum" of the schema.
+    """
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        seconds_per_1k_tokens: float = 0.0,
+        name: str = "fake",
+    ) -> None:
+        """
+        Initialize the FakeLLMBackend.
+
+        Args:
+            latency_seconds: Simulated latency of every call.
+            seconds_per_1k_tokens: Additional simulated latency per 1000 prompt tokens.
+            name: Name of the simulated deployment.
+        """
+        self.latency_seconds = latency_seconds
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self._name = name
+        self.calls = 0
+        self.prompt_chars = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def evaluate(self, prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]:
+        time.sleep(self._record(prompt))
+        return self.response(prompt, json_schema)
+
+    async def aevaluate(self, prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(self._record(prompt))
+        return self.response(prompt, json_schema)
+
+    def _record(self, prompt: str) -> float:
+        """Count the call and return its simulated latency."""
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        return self.latency_seconds + self.seconds_per_1k_tokens * estimate_tokens(prompt) / 1000
+
+    @staticmethod
+    def response(prompt: str, json_schema: dict[str, Any]) -> dict[str, Any]:
+        """Return the deterministic response to a prompt."""
+        prompt_digest: bytes = hashlib.sha256(prompt.encode("utf-8", errors="surrogatepass")).digest()
+        response: dict[str, Any] = {}
+        for name, schema in json_schema.get("properties", {}).items():
+            seed: int = int.from_bytes(hashlib.sha256(prompt_digest + name.encode("utf-8")).digest()[:8], "big")
+            response[name] = _fake_value(schema, seed, name)
+        return response
+
+
+def _fake_value(schema: dict[str, Any], seed: int, name: str) -> Any:
+    schema_type = schema.get("type", "string")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type in ("integer", "number"):
+        minimum = schema.get("minimum", 0)
+        maximum = schema.get("maximum", minimum + 100)
+        if schema_type == "integer":
+            return int(minimum) + seed % (int(maximum) - int(minimum) + 1)
+        return minimum + (maximum - minimum) * (seed % 10_000) / 9_999
+    if schema_type == "boolean":
+        return seed % 2 == 0
+    if schema_type == "null":
+        return None
+    if schema_type == "array":
+        return []
+    if schema_type == "object":
+        return {}
+    return f"Simulated {name.replace('_', ' ')} {seed % 1000}."
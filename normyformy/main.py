@@ -1,14 +1,32 @@
 """Code reviewer that checks policies against the code and generates a report."""
+import asyncio
+import hashlib
+import json
+import logging
 import os
 import pathlib
 from typing import Any
 from pydantic import BaseModel
 from genson import SchemaBuilder
-from langchain_openai import AzureChatOpenAI
 import re
-from normyformy.generate_file_report import generate_file_report
+import time
+from normyformy.budgeted_report import estimate_tokens
+from normyformy.generate_file_report import create_report_formatter, generate_file_report
+from normyformy.llm_backend import AzureOpenAIBackend, LLMBackend
+from normyformy.map_reduce import (
+    DEFAULT_SHARD_TOKEN_BUDGET,
+    ShardResult,
+    evaluate_shards,
+    shard_directory_tree,
+    shard_report,
+)
+from normyformy.response_cache import ResponseCache
+from normyformy.review_state import ReviewState
+import rich.markup
 import rich.table
 
+logger = logging.getLogger(__name__)
+
 AZURE_ENDPOINT: str = "https://gf-oai-gwcml-s-swno.openai.azure.com/"
 AZURE_OPENAI_API_KEY: str = os.getenv("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_API_VERSION: str = "2024-10-21"
@@ -65,20 +83,9 @@ def _create_validation_model(
     return schema
 
 
-def evaluate_policies(
-    code_report: str,
-    policies_to_review: list[PolicyToReview],
-    llm: AzureChatOpenAI,
-) -> dict[str, bool]:
-    """Generate the booleans for the validation properties based on the document."""
-    print("Evaluating policies...")
-    property_sanitized_lookup: dict[str, str] = {
-        _sanitize_property_name(prop.name): prop.name for prop in policies_to_review
-    }
-    json_schema = _create_validation_model(
-        sanitized_validation_policies=list(property_sanitized_lookup.keys()),
-    )
-    prompt: str = (
+def _build_evaluation_prompt(code_report: str, policies_to_review: list[PolicyToReview]) -> str:
+    """Build the prompt asking the LLM to evaluate the policies against the code report."""
+    return (
         "You are an opinionated lead developer. You are an expert in domain driven design and clean architecture. You are reviewing a new codebase and checking if it aligns with clean architecture principles. Given the following codebase report, evaluate whether each policy is followed. "
         "Policies to Review:\n"
         + "\n".join([f"- {prop.name}: {prop.description}" for prop in policies_to_review]) +
@@ -88,11 +95,111 @@ def evaluate_policies(
         "\n\nReturn a JSON object following the provided schema. "
         "First shortly reason around if the policy is followed in the '_review_comment' field, focus upon things that can be improved if any in the comment. Only do a short single sentence with your conclusion. Then conclude by setting the corresponding '_policy_followed_verdict' property to a value between 0 and 5, where 0 means not followed at all and 5 means fully followed. If the policy is not applicable, set the '_policy_followed_verdict' to None. If you do not give it 5 then focus the review comment on why it is not a perfect 5.\n\n"
     )
-    print("Running LLM...")
-    response = llm.with_structured_output(json_schema).invoke(prompt)
-    print("Finished running LLM.")
+
+
+def _create_schema_for_policies(policies_to_review: list[PolicyToReview]) -> dict[str, Any]:
+    """Create the structured output schema for a list of policies."""
+    return _create_validation_model(
+        sanitized_validation_policies=list(dict.fromkeys(_sanitize_property_name(prop.name) for prop in policies_to_review)),
+    )
+
+
+def _policies_hash(policies_to_review: list[PolicyToReview], backend: LLMBackend) -> str:
+    """Return the hash identifying the policies, prompt and model of an incremental review."""
+    identity: list[Any] = [
+        backend.name,
+        _build_evaluation_prompt("", policies_to_review),
+        _create_schema_for_policies(policies_to_review),
+    ]
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def evaluate_policies(
+    code_report: str,
+    policies_to_review: list[PolicyToReview],
+    backend: LLMBackend,
+    response_cache: ResponseCache | None = None,
+) -> dict[str, bool]:
+    """Generate the booleans for the validation properties based on the document.
+
+    With a `response_cache`, the response to an identical prompt and schema sent to the
+    same deployment is reused instead of calling the LLM.
+    """
+    logger.info("Evaluating policies...")
+    json_schema = _create_schema_for_policies(policies_to_review)
+    prompt: str = _build_evaluation_prompt(code_report, policies_to_review)
+    cache_key: str | None = None
+    if response_cache is not None:
+        cache_key = response_cache.key(backend.name, prompt, json_schema)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Using the cached LLM response.")
+            return cached
+    logger.info("Running LLM...")
+    start: float = time.perf_counter()
+    response = backend.evaluate(prompt, json_schema)
+    logger.info(f"Finished running LLM in {time.perf_counter() - start:.1f}s.")
+    if cache_key is not None and isinstance(response, dict):
+        response_cache.put(cache_key, response)
     return response
 
+
+async def evaluate_policies_async(
+    code_report: str,
+    policies_to_review: list[PolicyToReview],
+    backend: LLMBackend,
+    group_size: int = 1,
+    max_concurrency: int = 4,
+    response_cache: ResponseCache | None = None,
+) -> dict[str, Any]:
+    """Evaluate groups of policies in concurrent LLM calls and merge the results.
+
+    Each call gets a smaller prompt and schema than `evaluate_policies`, which evaluates all
+    policies in one call. The merged result has the same keys, so it can be passed to
+    `extract_policy_data` and `print_report`.
+
+    Args:
+        code_report: The code report to evaluate.
+        policies_to_review: The policies to evaluate.
+        backend: The LLM backend.
+        group_size: Number of policies evaluated per call.
+        max_concurrency: Maximum number of calls running at the same time.
+        response_cache: Cache of the responses of earlier calls, see `evaluate_policies`.
+
+    Returns:
+        The merged review comments and verdicts of all policies.
+    """
+    groups: list[list[PolicyToReview]] = [
+        policies_to_review[i:i + group_size] for i in range(0, len(policies_to_review), group_size)
+    ]
+    logger.info(f"Evaluating {len(policies_to_review)} policies in {len(groups)} calls, {max_concurrency} at a time...")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def evaluate_group(group: list[PolicyToReview]) -> dict[str, Any]:
+        json_schema = _create_schema_for_policies(group)
+        prompt: str = _build_evaluation_prompt(code_report, group)
+        cache_key: str | None = None
+        if response_cache is not None:
+            cache_key = response_cache.key(backend.name, prompt, json_schema)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        async with semaphore:
+            start: float = time.perf_counter()
+            response = await backend.aevaluate(prompt, json_schema)
+            logger.info(f"Evaluated {', '.join(policy.name for policy in group)} in {time.perf_counter() - start:.1f}s.")
+        if cache_key is not None and isinstance(response, dict):
+            response_cache.put(cache_key, response)
+        return response
+
+    start: float = time.perf_counter()
+    responses = await asyncio.gather(*(evaluate_group(group) for group in groups))
+    logger.info(f"Finished evaluating policies in {time.perf_counter() - start:.1f}s.")
+    evaluation: dict[str, Any] = {}
+    for response in responses:
+        evaluation.update(response)
+    return evaluation
+
 def print_report(evaluation: dict[str, bool]):
     """Print the evaluation report using rich in a table."""
     table = rich.table.Table(title="Policy Evaluation Report")
@@ -107,7 +214,8 @@ def print_report(evaluation: dict[str, bool]):
         verdict = data.get("verdict", None)
         comment = data.get("comment", "")
         verdict_display = str(verdict) if verdict is not None else "N/A"
-        table.add_row(policy_name, verdict_display, comment)
+        # Comments name shards in square brackets, which rich would parse as markup
+        table.add_row(rich.markup.escape(policy_name), verdict_display, rich.markup.escape(comment or ""))
 
     rich.print(table)
 
@@ -123,13 +231,132 @@ def extract_policy_data(evaluation: dict[str, Any]) -> dict[str, dict[str, Any]]
             policies_dict.setdefault(policy_name, {})["comment"] = value
     return policies_dict
 
-def main(path_code_to_review: pathlib.Path, policies: list[PolicyToReview]):
-    open_chat_llm = AzureChatOpenAI(
-        azure_endpoint=AZURE_ENDPOINT,
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_deployment=AZURE_DEPLOYMENT_CHAT,
-        api_version=AZURE_OPENAI_API_VERSION,
+async def evaluate_policies_in_shards(
+    path_code_to_review: pathlib.Path,
+    policies_to_review: list[PolicyToReview],
+    backend: LLMBackend,
+    shard_token_budget: int,
+    max_concurrency: int = 4,
+    response_cache: ResponseCache | None = None,
+    review_state_path: pathlib.Path | None = None,
+) -> dict[str, Any]:
+    """Evaluate the policies against shards of the code report that each fit the token budget.
+
+    Every shard is evaluated against all policies in one call, and the verdicts and comments
+    of the shards are combined per policy (see `normyformy.map_reduce`). With a
+    `review_state_path`, the review is incremental: shards whose files did not change since
+    the previous review reuse its evaluation, and only the other shards are sent to the LLM.
+
+    Args:
+        path_code_to_review: The directory of the code to review.
+        policies_to_review: The policies to evaluate.
+        backend: The LLM backend.
+        shard_token_budget: Maximum tokens of the prompt of a single shard.
+        max_concurrency: Maximum number of shards evaluated at the same time.
+        response_cache: Cache of the responses of earlier calls, see `evaluate_policies`.
+        review_state_path: JSON file with the state of the previous review, updated after
+            the review (see `normyformy.review_state`).
+
+    Returns:
+        The combined review comments and verdicts of all policies.
+    """
+    if not policies_to_review:
+        return {}
+    formatter = create_report_formatter(path_code_to_review, depth=-1, exclude_hidden=True)
+    directory_tree = shard_directory_tree(formatter.directory_tree, shard_token_budget)
+    reserved_tokens: int = estimate_tokens(_build_evaluation_prompt(directory_tree or "", policies_to_review))
+    file_contents: dict[pathlib.Path, str] = dict(formatter.file_contents)
+    shards = shard_report(file_contents, shard_token_budget, reserved_tokens=reserved_tokens)
+    state: ReviewState | None = None
+    reusable_results: dict[str, ShardResult] | None = None
+    if review_state_path is not None:
+        state = ReviewState.load(review_state_path, _policies_hash(policies_to_review, backend))
+        changes = state.changed_files(file_contents)
+        reusable_results = state.reusable_results(shards, changes)
+        logger.info(
+            f"Changes since the previous review: {changes.summary()}, "
+            f"evaluating {len(shards) - len(reusable_results)} of {len(shards)} shards"
+        )
+
+    async def evaluate_report(code_report: str) -> dict[str, Any]:
+        return await evaluate_policies_async(
+            code_report,
+            policies_to_review,
+            backend,
+            group_size=len(policies_to_review),
+            max_concurrency=1,
+            response_cache=response_cache,
+        )
+
+    result = await evaluate_shards(
+        shards,
+        evaluate_report,
+        project_name=formatter.project_name,
+        directory_tree=directory_tree,
+        max_concurrency=max_concurrency,
+        reusable_results=reusable_results,
     )
+    if state is not None:
+        state.update(file_contents, result)
+        state.save(review_state_path)
+    return result.evaluation
+
+
+def main(
+    path_code_to_review: pathlib.Path,
+    policies: list[PolicyToReview],
+    max_concurrency: int | None = None,
+    shard_token_budget: int | None = None,
+    bypass_response_cache: bool = False,
+    review_state_path: pathlib.Path | None = None,
+    backend: LLMBackend | None = None,
+):
+    """Review the code against the policies and print the report.
+
+    With `max_concurrency` every policy is evaluated in its own LLM call, running up to
+    that many calls at the same time, instead of evaluating all policies in one call.
+    With `shard_token_budget` the report is split into shards of at most that many tokens,
+    for codebases that do not fit the context window, and the shards are evaluated
+    `max_concurrency` at a time (4 by default).
+    LLM responses are cached in `.normyformy_cache`, so an unchanged codebase reviewed
+    against unchanged policies is not sent again. Use `bypass_response_cache` to call the
+    LLM regardless, the new responses replace the cached ones.
+    With `review_state_path` the review is incremental and sharded (see
+    `evaluate_policies_in_shards`), for repeated reviews of the same codebase such as in CI.
+    The LLM `backend` defaults to the Azure OpenAI chat deployment, use
+    `normyformy.llm_backend.FakeLLMBackend` to run the pipeline without network access.
+    """
+    response_cache = ResponseCache(bypass=bypass_response_cache)
+    if backend is None:
+        backend = AzureOpenAIBackend(
+            azure_endpoint=AZURE_ENDPOINT,
+            api_key=AZURE_OPENAI_API_KEY,
+            deployment=AZURE_DEPLOYMENT_CHAT,
+            api_version=AZURE_OPENAI_API_VERSION,
+        )
+    if review_state_path is not None and shard_token_budget is None:
+        shard_token_budget = DEFAULT_SHARD_TOKEN_BUDGET
+    if shard_token_budget is not None:
+        evaluation = asyncio.run(
+            evaluate_policies_in_shards(
+                path_code_to_review,
+                policies,
+                backend,
+                shard_token_budget,
+                max_concurrency=max_concurrency or 4,
+                response_cache=response_cache,
+                review_state_path=review_state_path,
+            )
+        )
+        print_report(evaluation)
+        return
     file_report = generate_file_report(path_code_to_review, depth=-1, exclude_hidden=True)
-    evaluation = evaluate_policies(file_report, policies, open_chat_llm)
+    if max_concurrency is None:
+        evaluation = evaluate_policies(file_report, policies, backend, response_cache=response_cache)
+    else:
+        evaluation = asyncio.run(
+            evaluate_policies_async(
+                file_report, policies, backend, max_concurrency=max_concurrency, response_cache=response_cache
+            )
+        )
     print_report(evaluation)
@@ -0,0 +1,360 @@
+"""Map-reduce evaluation of reports larger than the context window of the model.
+
+The file contents are split into shards that each fit a token budget (`shard_report`):
+
+- A directory whose files, including those of its subdirectories, fit the budget is one
+  shard. Otherwise the files directly in it form a shard of their own, split over several
+  shards in path order if needed, and its subdirectories are sharded in turn. The shards
+  only depend on the files below their directory, so a change in one module only changes
+  the shard holding it. Files that do not fit a shard on their own are compressed or
+  omitted as in `BudgetedReportBuilder`.
+- Shards are ordered by the importance of their most important file, so the core of the
+  codebase is evaluated first.
+
+Each shard is formatted as a report of its own and evaluated concurrently (the map step).
+The verdicts of the shards are then combined into one verdict per policy, weighted by the
+tokens of the shards, keeping the review comments of the shards with the lowest verdicts
+(the reduce step).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import pathlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+from normyformy.budgeted_report import BudgetedReportBuilder, estimate_tokens, load_files
+from normyformy.core.report import ReportFormatter
+from normyformy.python_module_compressor import FileLoaded
+
+logger = logging.getLogger(__name__)
+
+VERDICT_SUFFIX: str = "_policy_followed_verdict"
+COMMENT_SUFFIX: str = "_review_comment"
+
+DEFAULT_SHARD_TOKEN_BUDGET: int = 60_000
+"""Shard budget that leaves room for the response in a context window of 128k tokens."""
+
+MAX_REDUCED_COMMENTS: int = 3
+"""Review comments kept per policy when reducing the shard evaluations."""
+
+MAX_TREE_FRACTION: int = 4
+"""The directory tree is included in every shard when it uses at most 1/4 of the shard budget."""
+
+
+def _file_tokens(path: pathlib.Path, content: str) -> int:
+    """Estimate the tokens a file uses in a report, including its header."""
+    return estimate_tokens(f"\n\nFile: {path}\n{'-' * 40}\n{content}\n{'-' * 40}")
+
+
+@dataclass
+class ReportShard:
+    """Files of the report evaluated together in one call."""
+
+    directory: str
+    """The directory of the files, as a POSIX path relative to the root of the report."""
+
+    recursive: bool = False
+    """Whether the shard holds all files below the directory, or only the files directly in it."""
+
+    part: Optional[int] = None
+    """Number of the part for shards holding part of a directory split over several shards."""
+
+    file_contents: dict[pathlib.Path, str] = field(default_factory=dict)
+    tokens: int = 0
+    """Estimated tokens of the file contents."""
+
+    importance: int = 0
+    """Importance of the most important file in the shard."""
+
+    @property
+    def name(self) -> str:
+        """Name identifying the shard, the same in every review of the codebase."""
+        if self.directory == ".":
+            name: str = "all files" if self.recursive else "top-level files"
+        else:
+            name = f"{self.directory}/**" if self.recursive else f"{self.directory}/*"
+        return name if self.part is None else f"{name} (part {self.part})"
+
+    @property
+    def paths(self) -> list[str]:
+        """The POSIX paths of the files, sorted."""
+        return sorted(path.as_posix() for path in self.file_contents)
+
+    def add(self, file: FileLoaded, content: str, tokens: int) -> None:
+        self.file_contents[file.path] = content
+        self.tokens += tokens
+        self.importance = max(self.importance, file.importance)
+
+    def format(self, project_name: str, directory_tree: Optional[str]) -> str:
+        """Format the shard as a report, listing only its own files when there is no tree."""
+        if directory_tree is None:
+            directory_tree = "\n".join(path.as_posix() for path in self.file_contents)
+        return ReportFormatter(f"{project_name} ({self.name})", directory_tree, self.file_contents).format()
+
+
+def shard_report(
+    file_contents: dict[pathlib.Path, str],
+    shard_token_budget: int,
+    reserved_tokens: int = 0,
+) -> list[ReportShard]:
+    """Split the file contents of a report into shards that fit the token budget.
+
+    Args:
+        file_contents: Mapping of relative file paths to their contents.
+        shard_token_budget: Maximum tokens of the file contents of a shard.
+        reserved_tokens: Tokens of every shard used by the rest of the prompt, such as the
+            directory tree and the policies.
+
+    Returns:
+        The shards, the most important first.
+    """
+    budget: int = shard_token_budget - reserved_tokens
+    if budget <= 0:
+        raise ValueError(f"The shard budget of {shard_token_budget} tokens leaves no room for files")
+
+    files: list[FileLoaded] = sorted(load_files(file_contents), key=lambda file: file.path.as_posix())
+    costs: dict[pathlib.Path, int] = {file.path: _file_tokens(file.path, file.content) for file in files}
+    # Files directly in every directory, and tokens and subdirectories of every directory
+    direct_files: dict[pathlib.Path, list[FileLoaded]] = {}
+    subtree_tokens: dict[pathlib.Path, int] = {}
+    subdirectories: dict[pathlib.Path, dict[pathlib.Path, None]] = {}
+    for file in files:
+        direct_files.setdefault(file.path.parent, []).append(file)
+        for directory in file.path.parents:
+            subtree_tokens[directory] = subtree_tokens.get(directory, 0) + costs[file.path]
+            if directory.parent != directory:
+                subdirectories.setdefault(directory.parent, {})[directory] = None
+
+    shards: list[ReportShard] = []
+    pending: list[pathlib.Path] = [pathlib.Path(".")] if files else []
+    while pending:
+        directory = pending.pop()
+        if subtree_tokens[directory] <= budget:
+            shard = ReportShard(directory=directory.as_posix(), recursive=True)
+            below: list[FileLoaded] = _files_below(directory, direct_files, subdirectories)
+            for file in sorted(below, key=lambda file: file.path.as_posix()):
+                shard.add(file, file.content, costs[file.path])
+            shards.append(shard)
+            continue
+        shards.extend(_shard_directory_files(directory, direct_files.get(directory, []), costs, budget))
+        pending.extend(reversed(subdirectories.get(directory, {})))
+
+    # Stable sort, shards of equal importance stay in path order
+    shards.sort(key=lambda shard: -shard.importance)
+    logger.info(
+        f"Split {len(file_contents)} files into {len(shards)} shards of at most {shard_token_budget} tokens"
+    )
+    return shards
+
+
+def _files_below(
+    directory: pathlib.Path,
+    direct_files: dict[pathlib.Path, list[FileLoaded]],
+    subdirectories: dict[pathlib.Path, dict[pathlib.Path, None]],
+) -> list[FileLoaded]:
+    files: list[FileLoaded] = []
+    pending: list[pathlib.Path] = [directory]
+    while pending:
+        current = pending.pop()
+        files.extend(direct_files.get(current, []))
+        pending.extend(subdirectories.get(current, {}))
+    return files
+
+
+def _shard_directory_files(
+    directory: pathlib.Path,
+    files: list[FileLoaded],
+    costs: dict[pathlib.Path, int],
+    budget: int,
+) -> list[ReportShard]:
+    """Put the files directly in a directory into one shard, or several in path order if they do not fit."""
+    if not files:
+        return []
+    split: bool = sum(costs[file.path] for file in files) > budget
+    shards: list[ReportShard] = [ReportShard(directory=directory.as_posix(), part=1 if split else None)]
+    for file in files:
+        content: Optional[str] = file.content
+        tokens: int = costs[file.path]
+        if tokens > budget:
+            content = BudgetedReportBuilder(budget).build_from_loaded([file]).get(file.path)
+            if content is None:
+                logger.warning(f"Omitted {file.path}, it does not fit a shard of {budget} tokens")
+                continue
+            tokens = _file_tokens(file.path, content)
+        if shards[-1].tokens + tokens > budget:
+            shards.append(ReportShard(directory=directory.as_posix(), part=len(shards) + 1))
+        shards[-1].add(file, content, tokens)
+    return [shard for shard in shards if shard.file_contents]
+
+
+@dataclass
+class ShardResult:
+    """Evaluation of a single shard."""
+
+    name: str
+    file_count: int
+    tokens: int
+    seconds: float
+    evaluation: dict[str, Any]
+    paths: list[str] = field(default_factory=list)
+    """See `ReportShard.paths`."""
+
+    reused: bool = False
+    """Whether the evaluation was reused from an earlier run instead of calling the model."""
+
+
+@dataclass
+class MapReduceResult:
+    """Combined evaluation of all shards, with the results and timing of each shard."""
+
+    evaluation: dict[str, Any]
+    """Review comment and verdict per policy, with the keys of a single evaluation."""
+
+    shard_results: list[ShardResult]
+    seconds: float
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.shard_results)
+
+    def summary(self) -> str:
+        """Return a one line summary of the run."""
+        shard_seconds: float = sum(result.seconds for result in self.shard_results)
+        slowest: float = max((result.seconds for result in self.shard_results), default=0.0)
+        reused: int = sum(result.reused for result in self.shard_results)
+        return (
+            f"Evaluated {self.shard_count} shards ({reused} reused) in {self.seconds:.1f}s "
+            f"({shard_seconds:.1f}s in total, slowest shard {slowest:.1f}s)"
+        )
+
+
+def reduce_evaluations(shard_results: list[ShardResult], max_comments: int = MAX_REDUCED_COMMENTS) -> dict[str, Any]:
+    """Combine the evaluations of the shards into one evaluation.
+
+    The verdict of a policy is the mean of the shard verdicts weighted by the tokens of the
+    shards, rounded to one decimal. Shards where the policy is not applicable (a None
+    verdict) are left out, and the verdict is None when it applies to no shard.
+
+    Only the review comments of the shards with the lowest verdicts are kept, since they
+    explain what to improve, the largest shards first on equal verdicts. Identical comments
+    of several shards are kept once, prefixed by the names of all those shards.
+
+    Args:
+        shard_results: The evaluations of the shards.
+        max_comments: Maximum number of comments kept per policy.
+
+    Returns:
+        The combined review comments and verdicts.
+    """
+    policies: dict[str, None] = {}
+    for result in shard_results:
+        for key in result.evaluation:
+            if key.endswith(VERDICT_SUFFIX):
+                policies[key[:-len(VERDICT_SUFFIX)]] = None
+            elif key.endswith(COMMENT_SUFFIX):
+                policies[key[:-len(COMMENT_SUFFIX)]] = None
+
+    evaluation: dict[str, Any] = {}
+    for policy in policies:
+        weighted_sum: float = 0.0
+        total_weight: int = 0
+        comments: list[tuple[float, int, str, str]] = []
+        for result in shard_results:
+            verdict = result.evaluation.get(policy + VERDICT_SUFFIX)
+            has_verdict: bool = isinstance(verdict, (int, float)) and not isinstance(verdict, bool)
+            if has_verdict:
+                weight: int = max(result.tokens, 1)
+                weighted_sum += verdict * weight
+                total_weight += weight
+            comment = result.evaluation.get(policy + COMMENT_SUFFIX)
+            if comment:
+                comments.append((verdict if has_verdict else float("inf"), -result.tokens, comment, result.name))
+        comments.sort(key=lambda item: item[:2])
+        shard_names: dict[str, list[str]] = {}
+        for _, _, comment, name in comments:
+            shard_names.setdefault(comment, []).append(name)
+        grouped: list[tuple[str, list[str]]] = list(shard_names.items())
+        kept: list[str] = [f"[{', '.join(names)}] {comment}" for comment, names in grouped[:max_comments]]
+        omitted_shards: int = sum(len(names) for _, names in grouped[max_comments:])
+        if omitted_shards:
+            kept.append(f"(comments of {omitted_shards} more shards omitted)")
+        evaluation[policy + COMMENT_SUFFIX] = "\n".join(kept)
+        evaluation[policy + VERDICT_SUFFIX] = round(weighted_sum / total_weight, 1) if total_weight else None
+    return evaluation
+
+
+async def evaluate_shards(
+    shards: list[ReportShard],
+    evaluate_report: Callable[[str], Awaitable[dict[str, Any]]],
+    project_name: str,
+    directory_tree: Optional[str] = None,
+    max_concurrency: int = 4,
+    reusable_results: Optional[Mapping[str, ShardResult]] = None,
+) -> MapReduceResult:
+    """Evaluate the shards concurrently and reduce the results.
+
+    Args:
+        shards: The shards, see `shard_report`.
+        evaluate_report: Evaluates the policies against a report, such as
+            `evaluate_policies_async` with the policies and model bound.
+        project_name: Name of the project shown in the shard reports.
+        directory_tree: The directory tree included in every shard report, None lists only
+            the files of each shard.
+        max_concurrency: Maximum number of shards evaluated at the same time.
+        reusable_results: Results of an earlier run by shard name, for the shards whose files
+            did not change. These shards are not evaluated again.
+
+    Returns:
+        The combined evaluation with the results of the shards.
+    """
+    reusable_results = reusable_results or {}
+    logger.info(f"Evaluating {len(shards)} shards, {max_concurrency} at a time...")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def evaluate_shard(shard: ReportShard) -> ShardResult:
+        previous: Optional[ShardResult] = reusable_results.get(shard.name)
+        if previous is not None:
+            logger.info(f"Reusing the evaluation of unchanged shard {shard.name}.")
+            return ShardResult(
+                name=shard.name,
+                file_count=previous.file_count,
+                tokens=previous.tokens,
+                seconds=0.0,
+                evaluation=previous.evaluation,
+                paths=shard.paths,
+                reused=True,
+            )
+        async with semaphore:
+            start: float = time.perf_counter()
+            evaluation = await evaluate_report(shard.format(project_name, directory_tree))
+            seconds: float = time.perf_counter() - start
+            logger.info(f"Evaluated shard {shard.name} ({len(shard.file_contents)} files, {shard.tokens} tokens) in {seconds:.1f}s.")
+            return ShardResult(
+                name=shard.name,
+                file_count=len(shard.file_contents),
+                tokens=shard.tokens,
+                seconds=seconds,
+                evaluation=evaluation,
+                paths=shard.paths,
+            )
+
+    start: float = time.perf_counter()
+    shard_results: list[ShardResult] = list(await asyncio.gather(*(evaluate_shard(shard) for shard in shards)))
+    result = MapReduceResult(
+        evaluation=reduce_evaluations(shard_results),
+        shard_results=shard_results,
+        seconds=time.perf_counter() - start,
+    )
+    logger.info(result.summary())
+    return result
+
+
+def shard_directory_tree(directory_tree: str, shard_token_budget: int) -> Optional[str]:
+    """Return the directory tree if it is small enough to include in every shard, else None."""
+    if estimate_tokens(directory_tree) * MAX_TREE_FRACTION <= shard_token_budget:
+        return directory_tree
+    return None
@@ -0,0 +1,445 @@
+"""Outline compressors for languages other than Python.
+
+The compressors use a lightweight scanner instead of a parser, so they work for any file
+without external tools, at the cost of relying on a few heuristics:
+
+- Brace languages (TypeScript, JavaScript, C#, Go, Java, Rust, ...) are scanned for
+  blocks, skipping strings, comments, and the regular expression literals of JavaScript
+  and lifetimes of Rust. Sources with unbalanced braces are not compressed. A block whose
+  header looks like a function or method signature is a function body, a block whose
+  header starts with a keyword such as "class" or "interface" (after modifiers and
+  annotations) is a container whose members are compressed in turn, and namespaces are
+  always kept.
+- YAML is compressed by nesting depth, derived from the indentation of the lines.
+
+Removed content is replaced by a comment with the number of removed lines, like the
+placeholders of the Python compressor.
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from normyformy.python_module_compressor import DEFAULT_MAX_BODY_LINES, CompressionLevel
+
+_NAMESPACE_KEYWORDS = re.compile(r"^(export\s+)?(declare\s+)?(namespace|module|package)\b")
+_LEADING_ANNOTATIONS = re.compile(r"^(?:(?:@[\w.]+(?:\([^()]*\))?|\[[^\[\]]*\]|template\s*<[^{}]*?>)\s*)+")
+_CONTAINER_HEADER = re.compile(
+    r"^(?:(?:export|default|declare|abstract|public|private|protected|internal|static|sealed|partial|"
+    r"final|readonly|unsafe|data|open|inner|enum|annotation|value|case|ref|file|pub(?:\([\w ]+\))?)\s+)*"
+    r"(?:class|interface|struct|enum|record|trait|impl|object|extension|union)\b"
+    # Go type declarations
+    r"|^type\s+\w+(?:\[[^\]]*\])?\s+(?:struct|interface)\b"
+)
+_CONTROL_KEYWORDS = re.compile(
+    r"^(if|else|for|foreach|while|do|switch|catch|try|finally|using|lock|fixed|unsafe|checked|return|with|select|case|default|go|defer)\b"
+)
+_TYPESCRIPT_RETURN_TYPE = re.compile(r"\)\s*:\s*[\w$.<>\[\]{}|&,?'\" ]+$")
+# What may follow the parameter list of a function: C++ qualifiers, a return type after
+# "->" or ":" (or a C++ constructor initializer list), Java "throws" and "where" clauses
+_FUNCTION_SUFFIX = re.compile(
+    r"^(?:(?:const|noexcept(?:\([^)]*\))?|override|final|volatile|mutable|&&?)\s*)*"
+    r"(?:(?:->|:)\s*[^{};=]+?)?\s*"
+    r"(?:throws\s+[\w$.<>\[\], ]+?)?\s*"
+    r"(?:where\s+[^{};]+)?$"
+)
+_OBJECT_CREATION = re.compile(r"\bnew\s+[\w$.<>\[\], ]+\([^()]*\)$")
+_STATEMENT_BOUNDARIES = frozenset(";{}")
+# A "/" after one of these characters or keywords starts a regular expression literal
+# instead of a division
+_REGEX_PRECEDING_CHARACTERS = frozenset("(,=:[!&|?{};+-*%~^")
+_REGEX_PRECEDING_KEYWORDS = re.compile(
+    r"(?<![\w$.])(?:return|typeof|instanceof|case|do|else|in|of|new|delete|void|throw|yield|await)$"
+)
+_RUST_LIFETIME = re.compile(r"'[A-Za-z_]\w*(?!['\w])")
+
+
+@dataclass
+class _Block:
+    """A block between matching braces."""
+
+    header_start: int
+    """Offset of the first character of the text introducing the block."""
+
+    open: int
+    close: int
+    children: List["_Block"] = field(default_factory=list)
+
+
+def _removed_comment(line_count: int, single_line: bool) -> str:
+    message = f"<Content purposely removed: {line_count} lines>"
+    return f"/* {message} */" if single_line else f"// {message}"
+
+
+class _BraceScanner:
+    """Find the blocks and comments of a brace language source."""
+
+    def __init__(self, source: str, regex_literals: bool = False, lifetimes: bool = False) -> None:
+        """
+        Initialize the _BraceScanner.
+
+        Args:
+            source: The source to scan.
+            regex_literals: Skip JavaScript regular expression literals such as /[{]/.
+            lifetimes: Treat a quote followed by a name, such as 'a, as a Rust lifetime or
+                label instead of the start of a character literal.
+        """
+        self.source = source
+        self.regex_literals = regex_literals
+        self.lifetimes = lifetimes
+        self.blocks: List[_Block] = []
+        self.comments: List[Tuple[int, int]] = []
+
+    def scan(self) -> None:
+        """Find the blocks and comments.
+
+        Raises:
+            ValueError: If the braces are unbalanced, as the blocks could not be trusted.
+        """
+        source = self.source
+        length = len(source)
+        stack: List[_Block] = []
+        statement_start = 0
+        i = 0
+        while i < length:
+            char = source[i]
+            if char == "/" and (source.startswith("//", i) or source.startswith("/*", i)):
+                if source[i + 1] == "/":
+                    end = source.find("\n", i)
+                    end = length if end == -1 else end
+                else:
+                    end = source.find("*/", i + 2)
+                    end = length if end == -1 else end + 2
+                self.comments.append((i, end))
+                if not source[statement_start:i].strip():
+                    # Comments before a statement, such as doc comments, are not part of it
+                    statement_start = end
+                i = end
+                continue
+            if char == "/" and self.regex_literals and self._starts_regex(i):
+                i = self._skip_regex(i)
+                continue
+            if char == "'" and self.lifetimes:
+                lifetime = _RUST_LIFETIME.match(source, i)
+                if lifetime is not None:
+                    i = lifetime.end()
+                    continue
+            if char in "\"'`":
+                i = self._skip_string(i)
+                continue
+            if char == "{":
+                header_start = statement_start
+                while header_start < i and source[header_start].isspace():
+                    header_start += 1
+                block = _Block(header_start=header_start, open=i, close=-1)
+                (stack[-1].children if stack else self.blocks).append(block)
+                stack.append(block)
+            elif char == "}":
+                if not stack:
+                    raise ValueError(f"Unbalanced closing brace at offset {i}")
+                stack.pop().close = i
+            if char in _STATEMENT_BOUNDARIES:
+                statement_start = i + 1
+            i += 1
+        if stack:
+            raise ValueError(f"Unbalanced opening brace at offset {stack[-1].open}")
+
+    def _starts_regex(self, start: int) -> bool:
+        """Whether the "/" at `start` starts a regular expression literal rather than a division."""
+        end = start
+        while end > 0 and self.source[end - 1].isspace():
+            end -= 1
+        if end == 0:
+            return True
+        if self.source[end - 1] in _REGEX_PRECEDING_CHARACTERS:
+            return True
+        return _REGEX_PRECEDING_KEYWORDS.search(self.source[max(end - 12, 0):end]) is not None
+
+    def _skip_regex(self, start: int) -> int:
+        """Return the offset after the regular expression literal starting at `start`."""
+        source = self.source
+        in_class = False
+        i = start + 1
+        while i < len(source):
+            char = source[i]
+            if char == "\\":
+                i += 2
+                continue
+            if char == "\n":
+                break
+            if char == "[":
+                in_class = True
+            elif char == "]":
+                in_class = False
+            elif char == "/" and not in_class:
+                return i + 1
+            i += 1
+        # Not terminated on the same line, so it is not a regular expression literal
+        return start + 1
+
+    def _skip_string(self, start: int) -> int:
+        """Return the offset after the string starting at `start`."""
+        source = self.source
+        quote = source[start]
+        # C# verbatim strings escape quotes by doubling them instead of using backslashes
+        verbatim = quote == '"' and start > 0 and source[start - 1] == "@"
+        i = start + 1
+        while i < len(source):
+            char = source[i]
+            if char == "\\" and not verbatim:
+                i += 2
+                continue
+            if char == quote:
+                if verbatim and source.startswith(quote * 2, i):
+                    i += 2
+                    continue
+                return i + 1
+            if char == "\n" and quote != "`" and not verbatim:
+                # Unterminated string or a quote that does not start a string, such as an
+                # apostrophe in a regular expression of a language without regex literals
+                return i
+            i += 1
+        return i
+
+
+class _BraceCompressor:
+    """Compress a brace language source to a compression level."""
+
+    def __init__(self, scanner: _BraceScanner, level: CompressionLevel, max_body_lines: int) -> None:
+        self.source = scanner.source
+        self.scanner = scanner
+        self.level = level
+        self.max_body_lines = max_body_lines
+        self.edits: List[Tuple[int, int, str]] = []
+
+    def compress(self) -> str:
+        scanner = self.scanner
+        scanner.scan()
+        self._visit(scanner.blocks)
+        if self.level >= CompressionLevel.SIGNATURES:
+            self._remove_comments(scanner.comments)
+        return self._apply()
+
+    def _visit(self, blocks: List[_Block]) -> None:
+        for block in blocks:
+            header = self.source[block.header_start:block.open].strip()
+            if _NAMESPACE_KEYWORDS.match(header):
+                self._visit(block.children)
+            elif self._is_container(header):
+                if self.level >= CompressionLevel.OUTLINE:
+                    self._replace_body(block)
+                else:
+                    self._visit(block.children)
+            elif self._is_function(header):
+                if self.level == CompressionLevel.TRUNCATED_BODIES:
+                    self._truncate_body(block)
+                else:
+                    self._replace_body(block)
+            else:
+                self._visit(block.children)
+
+    @staticmethod
+    def _is_container(header: str) -> bool:
+        """A block introduced by a keyword such as "class", after modifiers and annotations."""
+        header = _LEADING_ANNOTATIONS.sub("", header)
+        return _CONTAINER_HEADER.match(header) is not None and "=>" not in header
+
+    @staticmethod
+    def _is_function(header: str) -> bool:
+        if not header or _CONTROL_KEYWORDS.match(header):
+            return False
+        if header.startswith("func ") or header.endswith("=>"):
+            return True
+        if "(" not in header or _OBJECT_CREATION.search(header):
+            return False
+        if header.endswith(")") or _TYPESCRIPT_RETURN_TYPE.search(header) is not None:
+            return True
+        # Find the parameter list, the first parentheses followed by a function suffix,
+        # skipping the arguments of annotations such as @Get("/path")
+        depth = 0
+        for i, char in enumerate(header):
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0 and _FUNCTION_SUFFIX.match(header[i + 1:].strip()):
+                    return True
+        return False
+
+    def _replace_body(self, block: _Block) -> None:
+        inner = self.source[block.open + 1:block.close]
+        if not inner.strip():
+            return
+        if "\n" not in inner:
+            replacement = f" {_removed_comment(1, single_line=True)} "
+        else:
+            line_count = inner.strip("\n").count("\n") + 1
+            indent = self._body_indent(block)
+            closing_indent = self._line_indent(block.close)
+            replacement = f"\n{indent}{_removed_comment(line_count, single_line=False)}\n{closing_indent}"
+        if len(replacement) < len(inner):
+            self.edits.append((block.open + 1, block.close, replacement))
+
+    def _truncate_body(self, block: _Block) -> None:
+        """Keep the first lines of the body, without cutting through a nested block."""
+        body_start = self.source.find("\n", block.open, block.close)
+        if body_start == -1:
+            return
+        cut = body_start + 1
+        for _ in range(self.max_body_lines):
+            next_line = self.source.find("\n", cut, block.close)
+            if next_line == -1:
+                return
+            cut = next_line + 1
+        for child in block.children:
+            if child.header_start < cut <= child.close:
+                cut = self.source.rfind("\n", 0, child.header_start) + 1
+                break
+        remaining = self.source[cut:block.close]
+        last_newline = remaining.rfind("\n")
+        if last_newline == -1 or not remaining[:last_newline].strip():
+            return
+        removed = remaining[:last_newline]
+        line_count = removed.strip("\n").count("\n") + 1
+        indent = self._body_indent(block)
+        self.edits.append((cut, cut + last_newline, f"{indent}{_removed_comment(line_count, single_line=False)}"))
+
+    def _remove_comments(self, comments: List[Tuple[int, int]]) -> None:
+        """Remove comments outside of the replaced bodies, with their line if it holds nothing else."""
+        replaced = sorted((start, end) for start, end, _ in self.edits)
+        replaced_starts = [start for start, _ in replaced]
+        for start, end in comments:
+            index = bisect.bisect_right(replaced_starts, start) - 1
+            if index >= 0 and start < replaced[index][1]:
+                continue
+            line_start = self.source.rfind("\n", 0, start) + 1
+            line_end = self.source.find("\n", end)
+            line_end = len(self.source) if line_end == -1 else line_end
+            if not self.source[line_start:start].strip() and not self.source[end:line_end].strip():
+                self.edits.append((line_start, min(line_end + 1, len(self.source)), ""))
+            else:
+                self.edits.append((start, end, ""))
+
+    def _body_indent(self, block: _Block) -> str:
+        for line in self.source[block.open + 1:block.close].split("\n")[1:]:
+            if line.strip():
+                return line[:len(line) - len(line.lstrip())]
+        return self._line_indent(block.open) + "    "
+
+    def _line_indent(self, offset: int) -> str:
+        line_start = self.source.rfind("\n", 0, offset) + 1
+        line = self.source[line_start:offset]
+        return line[:len(line) - len(line.lstrip())]
+
+    def _apply(self) -> str:
+        chunks: List[str] = []
+        position = 0
+        for start, end, replacement in sorted(self.edits):
+            if start < position:
+                # Overlapping edit, such as a comment inside a truncated body
+                continue
+            chunks.append(self.source[position:start])
+            chunks.append(replacement)
+            position = end
+        chunks.append(self.source[position:])
+        return "".join(chunks)
+
+
+def compress_brace_language(
+    source: str,
+    level: CompressionLevel,
+    max_body_lines: int = DEFAULT_MAX_BODY_LINES,
+    regex_literals: bool = False,
+    lifetimes: bool = False,
+) -> str:
+    """Compress TypeScript, JavaScript, C#, Go, Java or other C-like source to a level.
+
+    Args:
+        source: The source of the file.
+        level: The compression level, see `CompressionLevel`.
+        max_body_lines: Lines kept of each function body for `CompressionLevel.TRUNCATED_BODIES`.
+        regex_literals: Whether the language has regular expression literals, like JavaScript.
+        lifetimes: Whether the language has lifetimes, like Rust.
+
+    Returns:
+        The compressed source.
+
+    Raises:
+        ValueError: If the braces of the source are unbalanced.
+    """
+    if level == CompressionLevel.FULL:
+        return source
+    scanner = _BraceScanner(source, regex_literals=regex_literals, lifetimes=lifetimes)
+    return _BraceCompressor(scanner, level, max_body_lines).compress()
+
+
+def compress_javascript(source: str, level: CompressionLevel) -> str:
+    """Compress JavaScript or TypeScript source, see `compress_brace_language`."""
+    return compress_brace_language(source, level, regex_literals=True)
+
+
+def compress_rust(source: str, level: CompressionLevel) -> str:
+    """Compress Rust source, see `compress_brace_language`."""
+    return compress_brace_language(source, level, lifetimes=True)
+
+
+_YAML_MAX_DEPTH = {
+    CompressionLevel.TRUNCATED_BODIES: 4,
+    CompressionLevel.SIGNATURES_DOCSTRINGS: 3,
+    CompressionLevel.SIGNATURES: 2,
+    CompressionLevel.OUTLINE: 1,
+}
+
+
+def compress_yaml(source: str, level: CompressionLevel) -> str:
+    """Compress a YAML document by removing lines nested deeper than the level allows.
+
+    Args:
+        source: The YAML source.
+        level: The compression level. Comments are removed from `CompressionLevel.SIGNATURES`.
+
+    Returns:
+        The compressed source.
+    """
+    max_depth: Optional[int] = _YAML_MAX_DEPTH.get(level)
+    if max_depth is None:
+        return source
+    keep_comments = level <= CompressionLevel.SIGNATURES_DOCSTRINGS
+    output: List[str] = []
+    removed: List[str] = []
+    removed_indent = ""
+    indents: List[int] = []
+
+    def flush() -> None:
+        content_lines = [line for line in removed if line.strip()]
+        if content_lines:
+            output.append(f"{removed_indent}# <Content purposely removed: {len(content_lines)} lines>")
+        removed.clear()
+
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            if removed:
+                removed.append(line)
+            elif keep_comments or not stripped:
+                output.append(line)
+            continue
+        # The content of a sequence item is nested below the "- " marker
+        indent = len(line) - len(line.lstrip(" -")) if stripped.startswith("- ") else len(line) - len(line.lstrip())
+        while indents and indents[-1] > indent:
+            indents.pop()
+        if not indents or indents[-1] < indent:
+            indents.append(indent)
+        if len(indents) > max_depth:
+            if not removed:
+                removed_indent = line[:len(line) - len(line.lstrip())]
+            removed.append(line)
+            continue
+        flush()
+        output.append(line)
+    flush()
+    trailing_newline = "\n" if source.endswith("\n") else ""
+    return "\n".join(output) + trailing_newline
@@ -0,0 +1,145 @@
+"""Persistent cache for LLM responses.
+
+Responses are stored in a SQLite database under the SHA-256 hash of the model deployment,
+the prompt and the JSON schema of the structured output, so a review of unchanged code
+against unchanged policies is answered without calling the model. Entries expire after a
+time to live, and the least recently used entries are evicted when the cache grows beyond
+its size or entry limits.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import pathlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION: int = 1
+"""Part of every key, increase it when the prompt or response format changes."""
+
+DEFAULT_CACHE_PATH: pathlib.Path = pathlib.Path(".normyformy_cache") / "llm_responses.sqlite3"
+DEFAULT_TTL_SECONDS: float = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES: int = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES: int = 10_000
+
+
+class ResponseCache:
+    """SQLite backed cache of structured LLM responses."""
+
+    def __init__(
+        self,
+        path: pathlib.Path = DEFAULT_CACHE_PATH,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        bypass: bool = False,
+    ) -> None:
+        """
+        Initialize the ResponseCache.
+
+        Args:
+            path: Path of the SQLite database, created when needed.
+            ttl_seconds: Age after which an entry is no longer used, None keeps entries until
+                they are evicted.
+            max_bytes: Maximum total size of the stored responses.
+            max_entries: Maximum number of stored responses.
+            bypass: Ignore the stored responses, the new responses are still stored.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._initialized = False
+
+    @staticmethod
+    def key(deployment: str, prompt: str, schema: dict[str, Any]) -> str:
+        """Return the cache key of a prompt sent to a deployment with a structured output schema."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([CACHE_VERSION, deployment, schema], sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8", errors="surrogatepass"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return the stored response for the key, or None if it is not stored, expired or bypassed."""
+        if self.bypass:
+            self.misses += 1
+            return None
+        try:
+            with self._connect() as connection:
+                row = connection.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                now: float = time.time()
+                if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+                if row is not None:
+                    connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            response = json.loads(row[0]) if row is not None else None
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.warning(f"Could not read the LLM response cache {self.path}: {e}")
+            response = None
+        if response is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: dict[str, Any]) -> None:
+        """Store the response for the key and evict entries beyond the limits. Failures are logged and ignored."""
+        now: float = time.time()
+        try:
+            value: str = json.dumps(response)
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                self._evict(connection)
+        except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write to the LLM response cache {self.path}: {e}")
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        if self.ttl_seconds is not None:
+            connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        count, total_bytes = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        removed: list[str] = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if count - len(removed) <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            removed.append(key)
+            total_bytes -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in removed])
+        logger.info(f"Evicted {len(removed)} entries from the LLM response cache {self.path}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection and run a transaction, committed on success."""
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                if not self._initialized:
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS responses ("
+                        "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                    )
+                    connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+                    self._initialized = True
+                yield connection
+        finally:
+            connection.close()
@@ -0,0 +1,126 @@
+"""State of an incremental review, kept between runs in a JSON file.
+
+The state holds the SHA-256 of every reviewed file and the evaluation of every shard (see
+`normyformy.map_reduce`) by the name of the shard. On the next run, the changed files are
+found from the hashes, and shards without changed files reuse their evaluation, so only
+shards with changed files are sent to the model. The state is only valid for the policies, prompt and model it was created with,
+identified by `policies_hash`, and is discarded when they change.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+from normyformy.map_reduce import MapReduceResult, ReportShard, ShardResult
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION: int = 2
+"""Increase when the format of the state file changes."""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+@dataclass
+class FileChanges:
+    """Files changed since the previous review."""
+
+    added: list[str] = field(default_factory=list)
+    modified: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return f"{len(self.added)} added, {len(self.modified)} modified and {len(self.removed)} removed files"
+
+
+@dataclass
+class ReviewState:
+    """File hashes and shard evaluations of the previous review."""
+
+    policies_hash: str
+    file_hashes: dict[str, str] = field(default_factory=dict)
+    """SHA-256 of the content by relative file path."""
+
+    shard_results: dict[str, ShardResult] = field(default_factory=dict)
+    """Evaluation of the shards by shard name."""
+
+    @classmethod
+    def load(cls, path: pathlib.Path, policies_hash: str) -> "ReviewState":
+        """Load the state of the previous review, or an empty state if there is none for the policies."""
+        try:
+            data: dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(policies_hash=policies_hash)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read the review state {path}, reviewing all files: {e}")
+            return cls(policies_hash=policies_hash)
+        if data.get("version") != STATE_VERSION or data.get("policies_hash") != policies_hash:
+            logger.info("The policies, prompt or model changed since the previous review, reviewing all files")
+            return cls(policies_hash=policies_hash)
+        try:
+            shard_results = {key: ShardResult(**result) for key, result in data["shard_results"].items()}
+            return cls(policies_hash=policies_hash, file_hashes=dict(data["file_hashes"]), shard_results=shard_results)
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not use the review state {path}, reviewing all files: {e}")
+            return cls(policies_hash=policies_hash)
+
+    def save(self, path: pathlib.Path) -> None:
+        """Write the state atomically. Failures to write are logged and ignored."""
+        data: dict[str, Any] = {
+            "version": STATE_VERSION,
+            "policies_hash": self.policies_hash,
+            "file_hashes": self.file_hashes,
+            "shard_results": {key: asdict(result) for key, result in self.shard_results.items()},
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(temporary, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write the review state {path}: {e}")
+
+    def changed_files(self, file_contents: dict[pathlib.Path, str]) -> FileChanges:
+        """Compare the file contents with the files of the previous review."""
+        changes = FileChanges()
+        current: set[str] = set()
+        for path, content in file_contents.items():
+            key: str = path.as_posix()
+            current.add(key)
+            previous_hash: Optional[str] = self.file_hashes.get(key)
+            if previous_hash is None:
+                changes.added.append(key)
+            elif previous_hash != content_hash(content):
+                changes.modified.append(key)
+        changes.removed = sorted(set(self.file_hashes) - current)
+        return changes
+
+    def reusable_results(self, shards: list[ReportShard], changes: FileChanges) -> dict[str, ShardResult]:
+        """Return the previous evaluations of the shards without changed files, by shard name.
+
+        A shard is evaluated again when one of its files was added or modified, or when it
+        holds other files than in the previous review, such as after a file was removed.
+        """
+        changed: set[str] = set(changes.added) | set(changes.modified)
+        reusable: dict[str, ShardResult] = {}
+        for shard in shards:
+            previous: Optional[ShardResult] = self.shard_results.get(shard.name)
+            paths: list[str] = shard.paths
+            if previous is not None and previous.paths == paths and changed.isdisjoint(paths):
+                reusable[shard.name] = previous
+        return reusable
+
+    def update(self, file_contents: dict[pathlib.Path, str], result: MapReduceResult) -> None:
+        """Replace the state with the files and shard evaluations of a review."""
+        self.file_hashes = {path.as_posix(): content_hash(content) for path, content in file_contents.items()}
+        self.shard_results = {shard.name: shard for shard in result.shard_results}
@@ -0,0 +1,72 @@
+"""Check the persistent cache of compressed modules and its use by the compression stage."""
+
+import os
+import pathlib
+
+import pytest
+
+from normyformy import compression_cache
+from normyformy.compression_cache import CompressionCache
+from normyformy.compression_stage import CompressionOptions, CompressionStage
+
+SOURCE = "def add(a: int, b: int) -> int:\n    total = a + b\n    return total\n"
+
+
+@pytest.fixture
+def cache(tmp_path: pathlib.Path) -> CompressionCache:
+    return CompressionCache(tmp_path / "cache")
+
+
+def test_get_returns_stored_content(cache: CompressionCache) -> None:
+    key = cache.key(SOURCE, {"mode": "slice"})
+    assert cache.get(key) is None
+
+    cache.put(key, "compressed")
+
+    assert cache.get(key) == "compressed"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_source_options_and_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    key = CompressionCache.key(SOURCE, {"mode": "slice", "keep_docstrings": False})
+
+    assert key == CompressionCache.key(SOURCE, {"keep_docstrings": False, "mode": "slice"})
+    assert key != CompressionCache.key(SOURCE + "\n", {"mode": "slice", "keep_docstrings": False})
+    assert key != CompressionCache.key(SOURCE, {"mode": "slice", "keep_docstrings": True})
+    monkeypatch.setattr(compression_cache, "CACHE_VERSION", compression_cache.CACHE_VERSION + 1)
+    assert key != CompressionCache.key(SOURCE, {"mode": "slice", "keep_docstrings": False})
+
+
+@pytest.mark.parametrize("max_bytes, max_entries", [(10**9, 3), (3 * len("content 0"), 100)])
+def test_evict_removes_least_recently_used_entries(tmp_path: pathlib.Path, max_bytes: int, max_entries: int) -> None:
+    cache = CompressionCache(tmp_path / "cache", max_bytes=max_bytes, max_entries=max_entries)
+    keys = [cache.key(f"source {i}", {}) for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.put(key, f"content {i}")
+        os.utime(cache._path(key), (i, i))
+    # Reading an entry marks it as recently used
+    cache.get(keys[0])
+
+    removed = cache.evict()
+
+    assert removed == 2
+    assert [cache.get(key) is not None for key in keys] == [True, False, False, True, True]
+
+
+def test_evict_without_directory(cache: CompressionCache) -> None:
+    assert cache.evict() == 0
+
+
+def test_stage_reuses_cached_modules(tmp_path: pathlib.Path) -> None:
+    options = CompressionOptions(max_workers=1, cache_directory=tmp_path / "cache")
+    files = {pathlib.Path("a.py"): SOURCE, pathlib.Path("b.py"): SOURCE.replace("add", "sub"), pathlib.Path("c.txt"): "text"}
+    first = CompressionStage(options).run(files)
+
+    stage = CompressionStage(options)
+    second = stage.run({**files, pathlib.Path("b.py"): SOURCE.replace("add", "mul")})
+
+    assert stage.stats.cache_hits == 1
+    assert stage.stats.files_compressed == 2
+    assert second[pathlib.Path("a.py")] == first[pathlib.Path("a.py")]
+    assert "def mul" in second[pathlib.Path("b.py")]
+    assert second[pathlib.Path("c.txt")] == "text"
@@ -0,0 +1,75 @@
+"""Check nested ignore files and their precedence."""
+
+import pathlib
+
+import pytest
+
+from core.file_filter import FileFilter
+from core.scanner import DirectoryScanner
+from normyformy.generate_file_report import generate_file_report
+
+FILES = {
+    ".copconignore": "*.py\n!keep.py\n*.log\n",
+    "keep.py": "KEEP = True\n",
+    "drop.py": "DROP = True\n",
+    "notes.txt": "notes\n",
+    "sub/.copconignore": "!keep.log\nnotes.txt\n",
+    "sub/keep.log": "kept\n",
+    "sub/other.log": "ignored\n",
+    "sub/notes.txt": "ignored\n",
+    "sub/deeper/keep.log": "kept\n",
+    "sub/deeper/notes.txt": "ignored\n",
+}
+
+KEPT = {"keep.py", "notes.txt", "sub/keep.log", "sub/deeper/keep.log"}
+
+
+@pytest.fixture
+def directory(tmp_path: pathlib.Path) -> pathlib.Path:
+    for name, content in FILES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def reported_files(report: str) -> set[str]:
+    return {line[len("File: "):] for line in report.splitlines() if line.startswith("File: ")}
+
+
+@pytest.mark.parametrize("relative", [False, True], ids=["absolute", "relative"])
+def test_nested_negations(directory: pathlib.Path, relative: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    if relative:
+        monkeypatch.chdir(directory)
+        directory = pathlib.Path(".")
+
+    report = generate_file_report(directory, depth=-1, exclude_hidden=True)
+
+    assert reported_files(report) == KEPT
+
+
+@pytest.mark.parametrize("relative", [False, True], ids=["absolute", "relative"])
+def test_root_ignore_file_as_nested_rules(directory: pathlib.Path, relative: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    if relative:
+        monkeypatch.chdir(directory)
+        directory = pathlib.Path(".")
+    file_filter = FileFilter()
+
+    snapshot = DirectoryScanner(directory, file_filter).scan()
+
+    kept = {
+        entry.path.relative_to(directory).as_posix()
+        for entry in snapshot.iter_files()
+        if not entry.name.startswith(".") and not file_filter.should_ignore(entry.path, is_dir=False)
+    }
+    assert kept == KEPT
+
+
+def test_user_ignore_file_is_applied_once(directory: pathlib.Path) -> None:
+    file_filter = FileFilter(user_ignore_path=directory / ".copconignore")
+
+    file_filter.register_directory(directory, [".copconignore"])
+
+    assert file_filter._rules_for(directory) == ()
+    assert file_filter.should_ignore(directory / "drop.py", is_dir=False)
+    assert not file_filter.should_ignore(directory / "keep.py", is_dir=False)
@@ -0,0 +1,61 @@
+"""Check the byte budgets of the file content reader."""
+
+import pathlib
+
+import pytest
+
+from core.file_filter import FileFilter
+from core.file_reader import FileContentReader
+
+FILES = {
+    "a.py": "a" * 100,
+    "b.py": "b" * 100,
+    "c.py": "c" * 100,
+    "d.py": "d" * 100,
+    "e.py": "e" * 100,
+}
+
+
+@pytest.fixture
+def directory(tmp_path: pathlib.Path) -> pathlib.Path:
+    for name, content in FILES.items():
+        (tmp_path / name).write_text(content)
+    return tmp_path
+
+
+def create_reader(directory: pathlib.Path, **options: int) -> FileContentReader:
+    return FileContentReader(directory, FileFilter(), exclude_hidden=True, **options)
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_files_after_the_total_budget_are_summarized(directory: pathlib.Path, max_workers: int) -> None:
+    reader = create_reader(directory, max_total_bytes=250, max_workers=max_workers)
+
+    contents = reader.read_all()
+
+    assert contents == {pathlib.Path("a.py"): FILES["a.py"], pathlib.Path("b.py"): FILES["b.py"]}
+    assert reader.omitted_count == 3
+    assert reader.omitted_summary() == "[Omitted 3 files: total size budget of 250 bytes exhausted]"
+
+
+def test_file_exceeding_the_budget_is_not_read(directory: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    (directory / "b.py").write_text("b" * 10_000)
+    reader = create_reader(directory, max_total_bytes=1_000)
+    read = []
+    read_file = reader._read_file
+    monkeypatch.setattr(reader, "_read_file", lambda path: read.append(path.name) or read_file(path))
+
+    assert list(reader.read_all()) == [pathlib.Path("a.py")]
+    assert read == ["a.py"]
+    assert reader.omitted_count == 4
+
+
+def test_truncated_files_count_with_their_capped_size(directory: pathlib.Path) -> None:
+    (directory / "b.py").write_text("b" * 10_000)
+    reader = create_reader(directory, max_file_bytes=50, max_total_bytes=1_000)
+
+    contents = reader.read_all()
+
+    assert len(contents) == len(FILES)
+    assert "truncated 9950 bytes" in contents[pathlib.Path("b.py")]
+    assert reader.omitted_summary() == ""
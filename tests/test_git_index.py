@@ -0,0 +1,108 @@
+"""Check the git index parser against indexes written by git itself."""
+
+import pathlib
+import shutil
+import subprocess
+
+import pytest
+
+from core.git_index import GitIndexScanner, read_git_index
+from exceptions import FileReadError
+from normyformy.generate_file_report import generate_file_report
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+FILES = {
+    "README.md": "# Project\n",
+    "main.py": "print('main')\n",
+    "src/app.py": "import os\n",
+    "src/nested/deep/module.py": "VALUE = 1\n",
+    # Longer names than the previous entry exercise the prefix compression of version 4
+    "src/nested/deep/module_with_a_longer_name.py": "VALUE = 2\n",
+    "zzz.txt": "last\n",
+}
+
+
+def git(repository: pathlib.Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repository,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+@pytest.fixture
+def repository(tmp_path: pathlib.Path) -> pathlib.Path:
+    """A repository with the FILES committed."""
+    git(tmp_path, "init", "-q")
+    for name, content in FILES.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    git(tmp_path, "add", ".")
+    git(tmp_path, "commit", "-q", "-m", "initial")
+    return tmp_path
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_read_git_index_versions(repository: pathlib.Path, version: int) -> None:
+    skipped = set()
+    if version >= 3:
+        # Skip worktree entries use the extended flags of version 3 and later
+        git(repository, "update-index", "--skip-worktree", "src/app.py")
+        skipped.add("src/app.py")
+    git(repository, "update-index", "--index-version", str(version))
+    assert (repository / ".git" / "index").read_bytes()[4:8] == version.to_bytes(4, "big")
+
+    entries = read_git_index(repository / ".git" / "index")
+
+    assert [entry.path for entry in entries] == sorted(set(FILES) - skipped)
+    for entry in entries:
+        assert entry.size == len(FILES[entry.path].encode())
+
+
+def test_split_index_is_rejected(repository: pathlib.Path) -> None:
+    git(repository, "update-index", "--split-index")
+
+    with pytest.raises(FileReadError, match="split"):
+        read_git_index(repository / ".git" / "index")
+
+
+def test_truncated_index_is_rejected(repository: pathlib.Path) -> None:
+    index = repository / ".git" / "index"
+    index.write_bytes(index.read_bytes()[:100])
+
+    with pytest.raises(FileReadError):
+        read_git_index(index)
+
+
+def test_files_deleted_from_the_working_tree_are_skipped(repository: pathlib.Path) -> None:
+    (repository / "main.py").unlink()
+
+    snapshot = GitIndexScanner(repository).scan()
+
+    assert "main.py" not in {entry.name for entry in snapshot.iter_files()}
+    report = generate_file_report(repository, depth=-1, exclude_hidden=True, enumeration="git")
+    assert "File: main.py" not in report
+    assert "File: src/app.py" in report
+
+
+def test_unsupported_index_falls_back_to_the_file_system(repository: pathlib.Path) -> None:
+    git(repository, "update-index", "--split-index")
+    (repository / "untracked.py").write_text("UNTRACKED = True\n")
+
+    report = generate_file_report(repository, depth=-1, exclude_hidden=True, enumeration="git")
+
+    assert "File: untracked.py" in report
+    assert "File: src/nested/deep/module.py" in report
+
+
+def test_sha256_repository_is_rejected(tmp_path: pathlib.Path) -> None:
+    git(tmp_path, "init", "-q", "--object-format=sha256")
+    (tmp_path / "main.py").write_text("print('main')\n")
+    git(tmp_path, "add", ".")
+
+    with pytest.raises(FileReadError, match="SHA-256"):
+        read_git_index(tmp_path / ".git" / "index")
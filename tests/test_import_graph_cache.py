@@ -0,0 +1,88 @@
+"""Check that the import graph cache reuses modules with unchanged content."""
+
+import os
+import pathlib
+import sys
+from typing import Iterator
+
+import pytest
+
+pytest.importorskip("grimp")
+
+from normyformy.import_graph_cache import ContentHashCache, build_import_graph  # noqa: E402
+
+MODULES = {
+    "__init__.py": "",
+    "models.py": "import os\n",
+    "service.py": "from graphpackage import models\n",
+    "api/__init__.py": "",
+    "api/views.py": "from graphpackage.service import *\n",
+}
+
+
+@pytest.fixture
+def package(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[pathlib.Path]:
+    """An importable package with the MODULES."""
+    for name, content in MODULES.items():
+        path = tmp_path / "graphpackage" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield tmp_path / "graphpackage"
+    for name in [name for name in sys.modules if name.split(".")[0] == "graphpackage"]:
+        del sys.modules[name]
+
+
+@pytest.fixture
+def hash_hits(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """The content hash hits of each cache written by grimp."""
+    hits: list[int] = []
+    write = ContentHashCache.write
+
+    def recording_write(self, imports_by_module) -> None:
+        hits.append(self.hash_hits)
+        write(self, imports_by_module)
+
+    monkeypatch.setattr(ContentHashCache, "write", recording_write)
+    return hits
+
+
+def touch(path: pathlib.Path) -> None:
+    stat = path.stat()
+    os.utime(path, (stat.st_atime + 10, stat.st_mtime + 10))
+
+
+def imports(graph) -> set[tuple[str, str]]:
+    return {(module, imported) for module in graph.modules for imported in graph.find_modules_directly_imported_by(module)}
+
+
+def test_modules_with_new_modification_time_are_reused(package: pathlib.Path, tmp_path: pathlib.Path, hash_hits: list[int]) -> None:
+    cache_directory = tmp_path / "cache"
+    first = build_import_graph("graphpackage", cache_directory)
+    for path in package.rglob("*.py"):
+        touch(path)
+
+    second = build_import_graph("graphpackage", cache_directory)
+
+    assert hash_hits == [0, len(MODULES)]
+    assert imports(second) == imports(first)
+    assert ("graphpackage.api.views", "graphpackage.service") in imports(second)
+
+
+def test_changed_modules_are_parsed_again(package: pathlib.Path, tmp_path: pathlib.Path, hash_hits: list[int]) -> None:
+    cache_directory = tmp_path / "cache"
+    build_import_graph("graphpackage", cache_directory)
+    (package / "models.py").write_text("from graphpackage.api import views\n")
+    touch(package / "models.py")
+    touch(package / "service.py")
+
+    graph = build_import_graph("graphpackage", cache_directory)
+
+    assert hash_hits == [0, 1]
+    assert ("graphpackage.models", "graphpackage.api.views") in imports(graph)
+
+
+def test_graph_without_cache(package: pathlib.Path) -> None:
+    graph = build_import_graph("graphpackage", cache_directory=None)
+
+    assert ("graphpackage.service", "graphpackage.models") in imports(graph)
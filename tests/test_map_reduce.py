@@ -0,0 +1,89 @@
+"""Check the reduce step of the map-reduce evaluation."""
+
+import asyncio
+import pathlib
+
+import pytest
+
+from normyformy.llm_backend import FakeLLMBackend
+from normyformy.main import evaluate_policies_in_shards, print_report
+from normyformy.map_reduce import ReportShard, ShardResult, reduce_evaluations
+
+
+def shard_result(name: str, verdict: float | None, comment: str, tokens: int = 100) -> ShardResult:
+    return ShardResult(
+        name=name,
+        file_count=1,
+        tokens=tokens,
+        seconds=0.0,
+        evaluation={"tests_policy_followed_verdict": verdict, "tests_review_comment": comment},
+    )
+
+
+def test_verdict_is_weighted_by_tokens() -> None:
+    evaluation = reduce_evaluations([shard_result("a", 2, "a", tokens=300), shard_result("b", 4, "b", tokens=100)])
+
+    assert evaluation["tests_policy_followed_verdict"] == 2.5
+
+
+def test_shards_without_verdict_are_left_out() -> None:
+    evaluation = reduce_evaluations([shard_result("a", None, ""), shard_result("b", 4, "fine")])
+
+    assert evaluation["tests_policy_followed_verdict"] == 4
+    assert evaluation["tests_review_comment"] == "[b] fine"
+    assert reduce_evaluations([shard_result("a", None, "")])["tests_policy_followed_verdict"] is None
+
+
+def test_lowest_verdicts_are_kept_and_the_rest_counted() -> None:
+    results = [
+        shard_result("good", 5, "great"),
+        shard_result("bad", 1, "missing tests"),
+        shard_result("small", 2, "few tests", tokens=10),
+        shard_result("large", 2, "few tests elsewhere", tokens=1000),
+        shard_result("fine", 4, "mostly tested"),
+        shard_result("also bad", 1, "missing tests"),
+    ]
+
+    comment = reduce_evaluations(results, max_comments=3)["tests_review_comment"]
+
+    assert comment.splitlines() == [
+        "[bad, also bad] missing tests",
+        "[large] few tests elsewhere",
+        "[small] few tests",
+        "(comments of 2 more shards omitted)",
+    ]
+
+
+def test_comments_are_capped_for_many_shards() -> None:
+    results = [shard_result(f"package{i}", i % 5, f"comment {i}") for i in range(79)]
+
+    comment = reduce_evaluations(results)["tests_review_comment"]
+
+    assert len(comment.splitlines()) == 4
+    assert comment.splitlines()[-1] == "(comments of 76 more shards omitted)"
+
+
+def test_root_shard_has_a_readable_name() -> None:
+    assert ReportShard(directory=".").name == "top-level files"
+    assert ReportShard(directory=".", recursive=True).name == "all files"
+    assert ReportShard(directory="core", part=2).name == "core/* (part 2)"
+
+
+def test_shard_names_are_printed(capsys: pytest.CaptureFixture[str]) -> None:
+    evaluation = reduce_evaluations([shard_result("core", 1, "hello"), shard_result("/abs", 2, "world")])
+
+    print_report(evaluation)
+
+    output = capsys.readouterr().out
+    assert "[core] hello" in output
+    assert "[/abs] world" in output
+
+
+def test_no_policies_are_evaluated_without_calls(tmp_path: pathlib.Path) -> None:
+    (tmp_path / "main.py").write_text("print('main')\n")
+    backend = FakeLLMBackend()
+
+    evaluation = asyncio.run(evaluate_policies_in_shards(tmp_path, [], backend, shard_token_budget=8000))
+
+    assert evaluation == {}
+    assert backend.calls == 0
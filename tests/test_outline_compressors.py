@@ -0,0 +1,156 @@
+"""Check the outline compressors of brace languages."""
+
+import pathlib
+
+import pytest
+
+from normyformy.compressor_registry import DEFAULT_REGISTRY
+from normyformy.outline_compressors import compress_brace_language
+from normyformy.python_module_compressor import CompressionLevel
+
+BODY = """
+        int total = 0;
+        total += 1;
+        total += 2;
+        return total;
+"""
+
+SOURCES = {
+    "widget.js": """class Widget {
+    render(text) {
+        const pattern = /[{]/g;
+        const other = text.split(/}/);
+        return pattern.test(text) ? other : [];
+    }
+}
+
+function helper(value) {
+    const ratio = value / 2;
+    const scaled = ratio * 10;
+    return scaled / 3;
+}
+""",
+    "service.ts": """export class Service {
+    async load(id: string): Promise<Item[]> {%s    }
+}
+
+export const handler = (event: Event): void => {%s};
+""" % (BODY, BODY),
+    "parser.rs": """impl<'a> Parser<'a> {
+    pub fn parse(&mut self, input: &'a str) -> Result<Vec<&'a str>, Error> {%s    }
+}
+
+fn longest<'a>(x: &'a str, y: &'a str) -> &'a str {
+    'outer: loop {
+        let brace = '{';
+        break 'outer;
+    }
+    if x.len() > y.len() { x } else { y }
+}
+""" % BODY,
+    "Runner.java": """public class Runner {
+    @Override
+    public void run() throws IOException {%s    }
+}
+""" % BODY,
+    "buffer.cpp": """class Buffer {
+public:
+    int size() const {%s    }
+};
+""" % BODY,
+    "Cache.cs": """public class Cache<T> {
+    public T Get<T>(T key) where T : class {%s    }
+}
+""" % BODY,
+}
+
+KEPT_SIGNATURES = {
+    "widget.js": ["render(text) {", "function helper(value) {"],
+    "service.ts": ["async load(id: string): Promise<Item[]> {", "export const handler = (event: Event): void => {"],
+    "parser.rs": ["pub fn parse(&mut self, input: &'a str) -> Result<Vec<&'a str>, Error> {", "fn longest<'a>"],
+    "Runner.java": ["public void run() throws IOException {"],
+    "buffer.cpp": ["int size() const {"],
+    "Cache.cs": ["public T Get<T>(T key) where T : class {"],
+}
+
+CONTAINERS = {
+    "widget.js": "class Widget {",
+    "service.ts": "export class Service {",
+    "parser.rs": "impl<'a> Parser<'a> {",
+    "Runner.java": "public class Runner {",
+    "buffer.cpp": "class Buffer {",
+    "Cache.cs": "public class Cache<T> {",
+}
+
+
+def compress(name: str, level: CompressionLevel) -> str:
+    compressed = DEFAULT_REGISTRY.compress(pathlib.Path(name), SOURCES[name], level)
+    assert compressed is not None
+    return compressed
+
+
+def assert_balanced(source: str) -> None:
+    assert source.count("{") - source.count("'{'") == source.count("}")
+
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_signatures_keep_signatures_and_remove_bodies(name: str) -> None:
+    compressed = compress(name, CompressionLevel.SIGNATURES)
+
+    for signature in KEPT_SIGNATURES[name]:
+        assert signature in compressed
+    assert "Content purposely removed" in compressed
+    assert "total += 2" not in compressed
+    assert "ratio * 10" not in compressed
+    assert compressed.rstrip().endswith("}") or compressed.rstrip().endswith("};")
+
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_outline_keeps_top_level_declarations(name: str) -> None:
+    compressed = compress(name, CompressionLevel.OUTLINE)
+
+    lines = compressed.splitlines()
+    assert lines[0] == CONTAINERS[name]
+    assert lines[1].strip().startswith("// <Content purposely removed")
+    assert lines[2] in ("}", "};")
+    # Top-level functions after the container are kept, with their body removed
+    for signature in KEPT_SIGNATURES[name][1:]:
+        if not signature.startswith(" "):
+            assert signature in compressed
+
+
+def test_regex_literal_does_not_hide_the_rest_of_the_file() -> None:
+    compressed = compress("widget.js", CompressionLevel.OUTLINE)
+
+    assert compressed == (
+        "class Widget {\n"
+        "    // <Content purposely removed: 5 lines>\n"
+        "}\n"
+        "\n"
+        "function helper(value) {\n"
+        "    // <Content purposely removed: 3 lines>\n"
+        "}\n"
+    )
+
+
+def test_rust_lifetimes_are_not_character_literals() -> None:
+    compressed = compress("parser.rs", CompressionLevel.SIGNATURES)
+
+    assert compressed.count("// <Content purposely removed") == 2
+    assert "'outer" not in compressed
+    assert_balanced(compressed)
+
+
+def test_division_is_not_a_regex_literal() -> None:
+    source = "function f(a, b) {\n    const x = (a + b) / 2;\n    const y = a / b / x;\n    return { x, y };\n}\n"
+
+    compressed = compress_brace_language(source, CompressionLevel.SIGNATURES, regex_literals=True)
+
+    assert compressed == "function f(a, b) {\n    // <Content purposely removed: 3 lines>\n}\n"
+
+
+@pytest.mark.parametrize("source", ["class A {\n    void f() {\n    }\n", "void f() {\n}\n}\n"])
+def test_unbalanced_braces_are_not_compressed(source: str) -> None:
+    with pytest.raises(ValueError, match="Unbalanced"):
+        compress_brace_language(source, CompressionLevel.OUTLINE)
+    assert DEFAULT_REGISTRY.compress(pathlib.Path("A.java"), source, CompressionLevel.OUTLINE) is None
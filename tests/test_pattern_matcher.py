@@ -0,0 +1,96 @@
+"""Check that the compiled matcher agrees with pathspec."""
+
+import itertools
+
+import pathspec
+import pytest
+
+from core.pattern_matcher import CompiledMatcher
+
+PATTERNS = [
+    "*.pyc",
+    "__pycache__/",
+    "build/",
+    "/dist",
+    "/docs/*.md",
+    "!docs/keep.md",
+    "node_modules",
+    "src/**/generated/",
+    "**/fixtures/*.json",
+    "!**/fixtures/keep.json",
+    "*.log",
+    "!important.log",
+    "logs/",
+    "!logs/",
+    "temp*",
+    "data/*.csv",
+    "/config.ini",
+    "a/b",
+    "*.tar.gz",
+    "[Tt]humbs.db",
+    "?.tmp",
+    "**/secret",
+    "cache/**",
+    "!cache/keep/",
+]
+
+NAMES = [
+    "main.py",
+    "main.pyc",
+    "__pycache__",
+    "build",
+    "dist",
+    "docs",
+    "readme.md",
+    "keep.md",
+    "node_modules",
+    "src",
+    "generated",
+    "fixtures",
+    "data.json",
+    "keep.json",
+    "debug.log",
+    "important.log",
+    "logs",
+    "temporary.txt",
+    "data",
+    "table.csv",
+    "config.ini",
+    "a",
+    "b",
+    "archive.tar.gz",
+    "Thumbs.db",
+    "x.tmp",
+    "xy.tmp",
+    "secret",
+    "cache",
+    "keep",
+]
+
+
+def corpus() -> list[str]:
+    """Paths of up to three components, both as files and as directories."""
+    paths = []
+    for depth in (1, 2, 3):
+        for parts in itertools.product(NAMES[:12] if depth == 3 else NAMES, repeat=depth):
+            path = "/".join(parts)
+            paths.extend([path, path + "/"])
+    return paths
+
+
+@pytest.mark.parametrize("patterns", [PATTERNS, list(reversed(PATTERNS))], ids=["ordered", "reversed"])
+def test_compiled_matcher_agrees_with_pathspec(patterns: list[str]) -> None:
+    spec = pathspec.PathSpec.from_lines("gitwildmatch", patterns)
+    matcher = CompiledMatcher.from_spec(spec)
+
+    mismatches = [path for path in corpus() if matcher.match_file(path) != spec.match_file(path)]
+
+    assert not mismatches, f"Compiled matcher disagrees with pathspec for {mismatches[:10]}"
+
+
+def test_check_file_reports_negations() -> None:
+    matcher = CompiledMatcher.from_spec(pathspec.PathSpec.from_lines("gitwildmatch", ["*.log", "!important.log"]))
+
+    assert matcher.check_file("debug.log") is True
+    assert matcher.check_file("logs/important.log") is False
+    assert matcher.check_file("main.py") is None
@@ -0,0 +1,103 @@
+"""Check the slice mode and compression levels of the Python module compressor."""
+
+import ast
+import pathlib
+
+import pytest
+
+from normyformy.python_module_compressor import CompressionLevel, compress_python_module, compress_to_level
+
+PACKAGE = pathlib.Path(__file__).parent.parent / "normyformy"
+MODULES = sorted(PACKAGE.rglob("*.py"))
+
+SOURCE = '''"""Module docstring."""
+import os
+
+# Settings of the module
+DEFAULT = 1
+
+
+class Greeter:
+    """Greets people."""
+
+    greeting: str = "Hello"
+
+    def greet(self, name: str) -> str:
+        """Return the greeting."""
+        # Build the message
+        message = f"{self.greeting}, {name}"
+        message = message.strip()
+        message = message + "!"
+        return message
+
+    async def agreet(self, name: str) -> str:
+        return self.greet(name)
+
+
+def helper(value: int) -> int:
+    first = value + 1
+    second = first * 2
+    third = second - 3
+    fourth = third + 4
+    fifth = fourth * 5
+    return fifth
+'''
+
+
+def definitions(source: str) -> list[tuple[str, str, str]]:
+    """The functions and classes of a module with their arguments, in source order."""
+    return [
+        (type(node).__name__, node.name, ast.dump(node.args) if not isinstance(node, ast.ClassDef) else "")
+        for node in ast.walk(ast.parse(source))
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+
+
+def compress(source: str, mode: str) -> str:
+    return compress_python_module(source, keep_docstrings=True, keep_imports=True, include_line_count=True, mode=mode)
+
+
+@pytest.mark.parametrize("path", MODULES, ids=lambda path: path.relative_to(PACKAGE).as_posix())
+def test_slice_mode_keeps_the_definitions_of_unparse_mode(path: pathlib.Path) -> None:
+    source = path.read_text(encoding="utf-8")
+
+    sliced = compress(source, "slice")
+
+    assert definitions(sliced) == definitions(compress(source, "unparse"))
+
+
+def test_slice_mode_keeps_formatting_and_comments_outside_bodies() -> None:
+    sliced = compress(SOURCE, "slice")
+
+    assert "# Settings of the module\nDEFAULT = 1\n\n\nclass Greeter:" in sliced
+    assert "    greeting: str = \"Hello\"\n    '<Content purposely removed: 11 lines>'" in sliced
+    assert "# Build the message" not in sliced
+    assert "def helper(value: int) -> int:\n    '<Content purposely removed: 6 lines>'" in sliced
+
+
+def test_levels_compress_progressively() -> None:
+    sizes = [compress_to_level(SOURCE, level, max_body_lines=2).compressed_chars for level in CompressionLevel]
+
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[0] == len(SOURCE)
+    for level in CompressionLevel:
+        ast.parse(compress_to_level(SOURCE, level, max_body_lines=2).content)
+
+
+def test_truncated_bodies_keep_the_first_lines() -> None:
+    content = compress_to_level(SOURCE, CompressionLevel.TRUNCATED_BODIES, max_body_lines=2).content
+
+    assert "    first = value + 1\n    second = first * 2\n    '<Content purposely removed: 4 lines>'" in content
+    assert "import os" in content
+
+
+def test_signatures_and_outline() -> None:
+    signatures = compress_to_level(SOURCE, CompressionLevel.SIGNATURES).content
+    outline = compress_to_level(SOURCE, CompressionLevel.OUTLINE).content
+
+    assert "def greet(self, name: str) -> str:" in signatures
+    assert "Return the greeting" not in signatures
+    assert "Module docstring" not in signatures
+    assert "def greet" not in outline
+    assert "class Greeter:" in outline and "def helper(value: int) -> int:" in outline
+    assert "import os" not in outline
@@ -0,0 +1,85 @@
+"""Check the persistent cache of LLM responses."""
+
+import pathlib
+
+import pytest
+
+from normyformy import response_cache
+from normyformy.response_cache import ResponseCache
+
+SCHEMA = {"type": "object", "properties": {"verdict": {"type": "number"}}}
+
+
+@pytest.fixture
+def path(tmp_path: pathlib.Path) -> pathlib.Path:
+    return tmp_path / "cache" / "responses.sqlite3"
+
+
+def test_get_returns_stored_response(path: pathlib.Path) -> None:
+    cache = ResponseCache(path)
+    key = cache.key("gpt", "Review this code", SCHEMA)
+    assert cache.get(key) is None
+
+    cache.put(key, {"verdict": 4})
+
+    assert ResponseCache(path).get(key) == {"verdict": 4}
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_key_depends_on_deployment_prompt_and_schema() -> None:
+    key = ResponseCache.key("gpt", "Review this code", SCHEMA)
+
+    assert key == ResponseCache.key("gpt", "Review this code", dict(reversed(list(SCHEMA.items()))))
+    assert key != ResponseCache.key("other", "Review this code", SCHEMA)
+    assert key != ResponseCache.key("gpt", "Review this code!", SCHEMA)
+    assert key != ResponseCache.key("gpt", "Review this code", {"type": "object"})
+
+
+def test_bypass_ignores_but_stores_responses(path: pathlib.Path) -> None:
+    cache = ResponseCache(path, bypass=True)
+    key = cache.key("gpt", "prompt", SCHEMA)
+
+    cache.put(key, {"verdict": 1})
+
+    assert cache.get(key) is None
+    assert ResponseCache(path).get(key) == {"verdict": 1}
+
+
+def test_expired_responses_are_not_used(path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = ResponseCache(path, ttl_seconds=60)
+    key = cache.key("gpt", "prompt", SCHEMA)
+    monkeypatch.setattr(response_cache.time, "time", lambda: 1000.0)
+    cache.put(key, {"verdict": 1})
+
+    monkeypatch.setattr(response_cache.time, "time", lambda: 1059.0)
+    assert cache.get(key) == {"verdict": 1}
+    monkeypatch.setattr(response_cache.time, "time", lambda: 1061.0)
+    assert cache.get(key) is None
+
+
+@pytest.mark.parametrize("max_bytes, max_entries", [(10**9, 3), (3 * len('{"verdict": 0}'), 100)])
+def test_least_recently_used_responses_are_evicted(
+    path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, max_bytes: int, max_entries: int
+) -> None:
+    cache = ResponseCache(path, ttl_seconds=None, max_bytes=max_bytes, max_entries=max_entries)
+    keys = [cache.key("gpt", f"prompt {i}", SCHEMA) for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        monkeypatch.setattr(response_cache.time, "time", lambda i=i: float(i))
+        cache.put(key, {"verdict": i})
+    # Reading a response marks it as recently used
+    monkeypatch.setattr(response_cache.time, "time", lambda: 10.0)
+    cache.get(keys[0])
+
+    monkeypatch.setattr(response_cache.time, "time", lambda: 11.0)
+    cache.put(keys[3], {"verdict": 3})
+
+    assert [cache.get(key) is not None for key in keys] == [True, False, True, True]
+
+
+def test_unreadable_database_is_a_miss(path: pathlib.Path) -> None:
+    path.parent.mkdir(parents=True)
+    path.write_text("not a database")
+    cache = ResponseCache(path)
+
+    assert cache.get(cache.key("gpt", "prompt", SCHEMA)) is None
+    assert cache.misses == 1
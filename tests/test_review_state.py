@@ -0,0 +1,98 @@
+"""Check that incremental reviews only re-evaluate the shards with changed files."""
+
+import asyncio
+import pathlib
+
+import pytest
+
+from normyformy.llm_backend import FakeLLMBackend
+from normyformy.main import PolicyToReview, evaluate_policies_in_shards
+from normyformy.map_reduce import shard_report
+from normyformy.review_state import ReviewState
+
+PACKAGES = ["app", "app/api", "app/models", "core", "core/io", "tools", "utils"]
+
+POLICIES = [
+    PolicyToReview(name="Small functions", description="Functions do one thing and are short."),
+    PolicyToReview(name="Type hints", description="Public functions have type hints."),
+]
+
+SHARD_TOKEN_BUDGET = 4000
+
+
+def module(name: str, functions: int = 20) -> str:
+    return "\n".join(f"def {name}_{i}(value: int) -> int:\n    return value * {i}\n" for i in range(functions))
+
+
+@pytest.fixture
+def directory(tmp_path: pathlib.Path) -> pathlib.Path:
+    for package in PACKAGES:
+        for name in ("first", "second", "third"):
+            path = tmp_path / package / f"{name}.py"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(module(name))
+    (tmp_path / "main.py").write_text(module("main"))
+    return tmp_path
+
+
+def review(directory: pathlib.Path, backend: FakeLLMBackend, state_path: pathlib.Path) -> dict:
+    return asyncio.run(
+        evaluate_policies_in_shards(directory, POLICIES, backend, SHARD_TOKEN_BUDGET, review_state_path=state_path)
+    )
+
+
+def file_contents(directory: pathlib.Path) -> dict[pathlib.Path, str]:
+    return {path.relative_to(directory): path.read_text() for path in sorted(directory.rglob("*.py"))}
+
+
+def test_shard_boundaries_do_not_depend_on_other_directories(directory: pathlib.Path) -> None:
+    before = {shard.name: shard.paths for shard in shard_report(file_contents(directory), 3000)}
+    # The app directory no longer fits a single shard
+    with (directory / "app" / "first.py").open("a") as f:
+        f.write(module("added", functions=25))
+
+    after = {shard.name: shard.paths for shard in shard_report(file_contents(directory), 3000)}
+
+    assert set(before) - set(after) == {"app/**"}
+    assert set(after) - set(before) == {"app/*", "app/api/**", "app/models/**"}
+    for name in set(before) & set(after):
+        assert before[name] == after[name]
+
+
+def test_change_in_one_module_only_reevaluates_its_shard(directory: pathlib.Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+    state_path = tmp_path_factory.mktemp("state") / "review_state.json"
+    backend = FakeLLMBackend()
+    review(directory, backend, state_path)
+    shard_count = backend.calls
+    assert shard_count > 3
+
+    review(directory, backend, state_path)
+    assert backend.calls == shard_count
+
+    with (directory / "core" / "io" / "second.py").open("a") as f:
+        f.write(module("added", functions=25))
+    review(directory, backend, state_path)
+
+    assert backend.calls == shard_count + 1
+
+
+def test_removed_file_reevaluates_its_shard(directory: pathlib.Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+    state_path = tmp_path_factory.mktemp("state") / "review_state.json"
+    backend = FakeLLMBackend()
+    review(directory, backend, state_path)
+    shard_count = backend.calls
+
+    (directory / "tools" / "third.py").unlink()
+    review(directory, backend, state_path)
+
+    assert backend.calls == shard_count + 1
+
+
+def test_state_of_other_policies_is_discarded(directory: pathlib.Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+    state_path = tmp_path_factory.mktemp("state") / "review_state.json"
+    review(directory, FakeLLMBackend(), state_path)
+
+    state = ReviewState.load(state_path, policies_hash="other policies")
+
+    assert state.shard_results == {}
+    assert state.file_hashes == {}